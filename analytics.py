@@ -0,0 +1,134 @@
+"""
+Score how difficult boards are, for a range of seeds, and stream the scores
+to CSV or JSON lines. Boards are set up in the same way as Game does, so the
+board for a seed can be played with Game(width, height, number_of_mines, seed).
+Every score is a dict with:
+- seed, width, height, mines
+- three_bv: smallest number of moves needed to clear the board (see Regions)
+- openings: number of areas of zeros
+- isolated: number of locations with a number that don't border any zero
+- solvable: fraction of the locations without a mine that the solver clears,
+  starting on the largest opening, before it would have to guess
+"""
+import argparse
+from collections import deque
+import csv
+import json
+from multiprocessing import Pool
+import sys
+
+from minesweep import Game
+from solver import Solver
+
+FIELDS = ['seed', 'width', 'height', 'mines', 'three_bv', 'openings', 'isolated', 'solvable']
+
+
+def score_board(width, height, number_of_mines, seed):
+    """Score the board for a seed; returns a dict with the FIELDS."""
+    game = Game(width, height, number_of_mines, seed=seed)
+    regions = game.regions
+    score = {'seed': seed, 'width': width, 'height': height, 'mines': number_of_mines,
+             'three_bv': regions.three_bv, 'openings': len(regions),
+             'isolated': regions.isolated, 'solvable': 0.0}
+    if not len(regions):
+        # Without an opening every first move is a guess
+        return score
+
+    offsets = regions.offsets
+    largest = max(range(len(regions)), key=lambda label: offsets[label + 1] - offsets[label])
+    start = next((x, y) for x, y in regions.area(largest) if game.counts[y][x] == 0)
+    solver = Solver(game.board)
+    solver.update(game.move(start))
+    while not game.over:
+        safe, _ = solver.solve()
+        if not safe:
+            break
+        solver.update(game.move(safe.pop()))
+    score['solvable'] = ((width * height - game.covered) /
+                         (width * height - number_of_mines))
+    return score
+
+
+def _score_shard(shard):
+    """Score the boards for one shard of seeds. This runs in a worker process,
+    so it has to be a module level function."""
+    width, height, number_of_mines, first_seed, number_of_boards = shard
+    return [score_board(width, height, number_of_mines, seed)
+            for seed in range(first_seed, first_seed + number_of_boards)]
+
+
+def iter_scores(width, height, number_of_mines, first_seed, number_of_boards,
+                processes=None, shard_size=100):
+    """Yield the score for every board with seed first_seed up to (but not
+    including) first_seed + number_of_boards, in order of seed.
+    With processes, the boards are scored in shards over a pool of worker
+    processes. Only a few shards per worker are handed out ahead of time, so
+    memory use stays the same however many boards there are."""
+    if not processes:
+        for seed in range(first_seed, first_seed + number_of_boards):
+            yield score_board(width, height, number_of_mines, seed)
+        return
+
+    shards = ((width, height, number_of_mines, seed,
+               min(shard_size, first_seed + number_of_boards - seed))
+              for seed in range(first_seed, first_seed + number_of_boards, shard_size))
+    with Pool(processes) as pool:
+        # Unlike imap, which reads all its input up front, keep a limited
+        # number of shards going
+        waiting = deque()
+        for shard in shards:
+            waiting.append(pool.apply_async(_score_shard, (shard,)))
+            if len(waiting) >= 2 * processes:
+                yield from waiting.popleft().get()
+        while waiting:
+            yield from waiting.popleft().get()
+
+
+def write_csv(scores, file):
+    """Write scores to a file as CSV, with a header line. Returns the number
+    of scores written."""
+    writer = csv.DictWriter(file, FIELDS)
+    writer.writeheader()
+    count = 0
+    for score in scores:
+        writer.writerow(score)
+        count += 1
+    return count
+
+
+def write_jsonl(scores, file):
+    """Write scores to a file as JSON lines; one object per line. Returns the
+    number of scores written."""
+    count = 0
+    for score in scores:
+        file.write(json.dumps(score, separators=(',', ':')) + '\n')
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score the difficulty of boards.')
+    parser.add_argument('--boards', type=int, default=1000)
+    parser.add_argument('--width', type=int, default=9)
+    parser.add_argument('--height', type=int, default=9)
+    parser.add_argument('--mines', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first board')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--output', help='file to write the scores to, instead of standard output')
+    parser.add_argument('--processes', type=int,
+                        help='score boards over this many worker processes')
+    args = parser.parse_args(argv)
+
+    scores = iter_scores(args.width, args.height, args.mines, args.seed, args.boards,
+                         args.processes)
+    write = write_csv if args.format == 'csv' else write_jsonl
+    if args.output:
+        with open(args.output, 'w', newline='') as file:
+            write(scores, file)
+    else:
+        write(scores, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
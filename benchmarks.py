@@ -0,0 +1,146 @@
+"""
+Benchmarks for the core functions of minesweep.py, over a range of board sizes
+and mine densities. Results are written as JSON, and can be compared with a
+stored baseline to catch functions that got slower.
+The ones starting with bitboard_ time the same work with bitboard.py, to
+compare with the ones without.
+"""
+import argparse
+import contextlib
+import io
+import json
+from random import Random
+import sys
+import time
+
+import bitboard
+import minesweep
+
+SIZES = [(9, 9), (30, 16), (100, 100), (300, 300)]
+DENSITIES = [0.12, 0.2]
+
+
+def _best_time(function, repeat, min_seconds=0.01):
+    """Shortest time in seconds for a call to a function, out of a number of
+    repeats. Fast functions are called several times per repeat, until that
+    takes at least min_seconds, to keep timer noise out of the results."""
+    best = float('inf')
+    calls = 1
+    for _ in range(repeat):
+        while True:
+            start = time.perf_counter()
+            for _ in range(calls):
+                function()
+            seconds = time.perf_counter() - start
+            if seconds >= min_seconds:
+                break
+            calls *= 2
+        best = min(best, seconds / calls)
+    return best
+
+
+def _clear_all(width, height, mines, counts):
+    """Clear every location without a mine, one move at a time, and return
+    the board."""
+    board = minesweep.setup_board(width, height)
+    for y in range(height):
+        for x in range(width):
+            if counts[y][x] != minesweep.MINE and board[y][x] < 0:
+                minesweep.update_board((x, y), board, mines, width, height, counts)
+    return board
+
+
+def _opening(width, height, counts):
+    """Location for a first move: a zero if there is one, otherwise the
+    lowest number."""
+    _, x, y = min((counts[y][x], x, y) for y in range(height) for x in range(width))
+    return x, y
+
+
+def _quietly(function, *args):
+    """Call a function with everything it prints thrown away."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(*args)
+
+
+def run_benchmarks(sizes=SIZES, densities=DENSITIES, repeat=3, seed=0):
+    """Time the core functions for every size and density. Returns a dict with
+    the best time in seconds for every benchmark, by name."""
+    results = {}
+    for width, height in sizes:
+        for density in densities:
+            number_of_mines = max(1, int(width * height * density))
+            case = '[{0}x{1}@{2:.2f}]'.format(width, height, density)
+            mines = minesweep.setup_mines(width, height, number_of_mines, Random(seed))
+            counts = minesweep.setup_counts(mines, width, height)
+            # Some locations to count mines around; only 100, as counting
+            # from the list of mines goes through the whole list every time
+            rng = Random(seed)
+            locations = [(rng.randrange(width), rng.randrange(height)) for _ in range(100)]
+            board = _clear_all(width, height, mines, counts)
+            opening = _opening(width, height, counts)
+            bits = bitboard.setup_mines(width, height, number_of_mines, Random(seed))
+            planes = bitboard.setup_counts(bits, width, height)
+            zero_bits = bitboard.zeros(bits, width, height, planes)
+
+            timings = {
+                'setup_mines': lambda: minesweep.setup_mines(
+                    width, height, number_of_mines, Random(seed)),
+                'setup_counts': lambda: minesweep.setup_counts(mines, width, height),
+                'count_adjacent_mines': lambda: [
+                    minesweep.count_adjacent_mines(location, mines, width, height)
+                    for location in locations],
+                'update_board': lambda: _clear_all(width, height, mines, counts),
+                'open_zero': lambda: minesweep.update_board(
+                    opening, minesweep.setup_board(width, height), mines, width, height, counts),
+                'bitboard_setup_counts': lambda: bitboard.setup_counts(bits, width, height),
+                'bitboard_open_zero': lambda: bitboard.update_board(
+                    opening, 0, bits, width, height, planes, zero_bits),
+                'reveal_board': lambda: _quietly(minesweep.reveal_board, mines, width, height),
+                'display_board': lambda: _quietly(minesweep.display_board, board),
+            }
+            for name, function in timings.items():
+                results[name + case] = _best_time(function, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Compare results with a baseline. Returns a list of (name, baseline time,
+    new time) for all benchmarks that got slower by more than the tolerance
+    (as a fraction). Benchmarks missing from either are ignored."""
+    return [(name, baseline[name], seconds) for name, seconds in sorted(results.items())
+            if name in baseline and seconds > baseline[name] * (1 + tolerance)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', default='benchmarks.json',
+                        help='file to write the results to')
+    parser.add_argument('--baseline', help='file with results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='fraction a benchmark may be slower than the baseline')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help='only use the small board sizes')
+    args = parser.parse_args(argv)
+
+    sizes = SIZES[:2] if args.quick else SIZES
+    results = run_benchmarks(sizes, repeat=args.repeat)
+    with open(args.output, 'w') as file:
+        json.dump({'python': sys.version.split()[0], 'results': results}, file,
+                  indent=2, sort_keys=True)
+    for name, seconds in sorted(results.items()):
+        print('{0:45} {1:12.6f}'.format(name, seconds))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        slower = compare(results, baseline, args.tolerance)
+        for name, before, after in slower:
+            print('SLOWER: {0} went from {1:.6f} to {2:.6f} seconds'.format(name, before, after))
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Version of the board functions in minesweep.py where the mines and the cleared
+locations are each a single (arbitrarily large) Python integer, with one bit
+per location: bit y * width + x. Counting neighbours and clearing areas are
+done with shifts and masks on whole boards at once, so the work per step is
+done in C instead of per location in Python.
+This pays off for work on the whole board: setting up the counts, and a move
+that opens a large area (see the bitboard_ timings in benchmarks.py). A move
+on a single number still takes a few whole-board operations, so clearing a
+board one location at a time is faster with minesweep.py.
+"""
+from functools import lru_cache
+from random import Random
+
+from minesweep import MINE, setup_mines as setup_mine_list
+
+
+def _from_flags(flags):
+    """Integer with bit i set where flags[i] is true."""
+    # Building a string of binary digits and converting that in one go takes
+    # linear time; setting bits one at a time takes quadratic time.
+    return int(''.join('1' if flag else '0' for flag in reversed(flags)) or '0', 2)
+
+
+def _to_flags(bits, size):
+    """String with '1' or '0' for each of the first size bits of an integer."""
+    return bin(bits)[2:].zfill(size)[::-1][:size]
+
+
+@lru_cache(maxsize=64)
+def _masks(width, height):
+    """Masks with all locations, all locations except the left column, and all
+    locations except the right column; remembered per board size."""
+    full = (1 << (width * height)) - 1
+    not_left = int(('1' * (width - 1) + '0') * height, 2)
+    not_right = int(('0' + '1' * (width - 1)) * height, 2)
+    return full, not_left, not_right
+
+
+def _shifts(bits, width, height):
+    """The 8 boards with every bit moved to one of its neighbours; so for
+    every location, whether that neighbour has a bit set."""
+    full, not_left, not_right = _masks(width, height)
+    # Moving a bit one to the left (x + 1) must not wrap into the next row
+    east = (bits << 1) & not_left
+    west = (bits >> 1) & not_right
+    shifted = []
+    for row in (bits, east, west):
+        shifted.append((row << width) & full)
+        shifted.append(row >> width)
+    return shifted + [east, west]
+
+
+def _dilate(bits, width, height):
+    """A board with the bits and all their neighbours set."""
+    full, not_left, not_right = _masks(width, height)
+    row = bits | ((bits << 1) & not_left) | ((bits >> 1) & not_right)
+    return row | ((row << width) & full) | (row >> width)
+
+
+def _fill(bits, allowed, width, height):
+    """Extend bits along straight lines (left, right, up and down) through
+    allowed locations. Each direction takes a number of steps that grows with
+    the logarithm of the board size (a Kogge-Stone fill), instead of one step
+    per location."""
+    full, not_left, not_right = _masks(width, height)
+    size = width * height
+    filled = bits
+    for shift, propagate in ((1, allowed & not_left), (-1, allowed & not_right),
+                             (width, allowed), (-width, allowed)):
+        grown = bits
+        step = abs(shift)
+        limit = width if step == 1 else size
+        while step < 2 * limit:
+            if shift > 0:
+                grown |= propagate & (grown << step)
+                propagate &= propagate << step
+            else:
+                grown |= propagate & (grown >> step)
+                propagate &= propagate >> step
+            step *= 2
+        filled |= grown
+    return filled & full
+
+
+def setup_mines(width, height, number_of_mines, rng=None):
+    """Set up the mines as a single integer, with a bit set for every mine."""
+    flags = bytearray(width * height)
+    for x, y in setup_mine_list(width, height, number_of_mines, rng or Random()):
+        flags[y * width + x] = 1
+    return _from_flags(flags)
+
+
+def setup_board(width, height):
+    """Set up the cleared locations; none yet."""
+    return 0
+
+
+def setup_counts(mines, width, height):
+    """Set up the number of adjacent mines for all locations at once, as 4
+    integers with bit 0, 1, 2 and 3 of the count for every location. The 8
+    shifted boards are added up bit by bit, like a hardware adder."""
+    planes = [0, 0, 0, 0]
+    for shifted in _shifts(mines, width, height):
+        carry = shifted
+        for i in range(4):
+            planes[i], carry = planes[i] ^ carry, planes[i] & carry
+            if not carry:
+                break
+    return tuple(planes)
+
+
+def count_adjacent_mines(move, mines, width, height, counts=None):
+    """Number of mines adjacent to the coordinates of a move (not counting
+    the location itself)."""
+    if counts is None:
+        counts = setup_counts(mines, width, height)
+    i = move[1] * width + move[0]
+    return sum(((plane >> i) & 1) << bit for bit, plane in enumerate(counts))
+
+
+def zeros(mines, width, height, counts=None):
+    """All locations without a mine and without adjacent mines."""
+    if counts is None:
+        counts = setup_counts(mines, width, height)
+    full = (1 << (width * height)) - 1
+    return full & ~(mines | counts[0] | counts[1] | counts[2] | counts[3])
+
+
+def update_board(move, cleared, mines, width, height, counts=None, zero_bits=None):
+    """Clear a location (after having already checked that it is not a mine),
+    in the same way as minesweep.update_board. As integers can't be changed,
+    this returns the new cleared locations instead.
+    Starting from the move, the area of zeros is grown along straight lines and
+    then diagonally, with whole-board operations, until it stops growing; after
+    which its border is added. To keep small areas cheap on large boards, this
+    is done on a band of rows around the move, which is made twice as high
+    whenever the area reaches its edge. Pass in zero_bits from zeros() to
+    avoid working that out for every move."""
+    x, y = move
+    bit = 1 << (y * width + x)
+    if zero_bits is None:
+        zero_bits = zeros(mines, width, height, counts)
+    if not zero_bits & bit:
+        return cleared | bit
+
+    band = 4
+    while True:
+        low = max(0, y - band)
+        high = min(height, y + band + 1)
+        rows = high - low
+        band_zeros = (zero_bits >> (low * width)) & ((1 << (rows * width)) - 1)
+        area = bit >> (low * width)
+        while True:
+            grown = _dilate(_fill(area, band_zeros, width, rows), width, rows) & band_zeros
+            if grown == area:
+                break
+            area = grown
+        reaches_bottom = low > 0 and area & ((1 << width) - 1)
+        reaches_top = high < height and area >> ((rows - 1) * width)
+        if not (reaches_bottom or reaches_top):
+            return cleared | (_dilate(area, width, rows) << (low * width))
+        band *= 2
+
+
+def count_bits(bits):
+    """Number of locations in a board."""
+    return bits.bit_count()
+
+
+def to_board(cleared, mines, width, height, counts=None):
+    """Cleared locations as list of lists, as from setup_board; for display_board.
+    Mines are shown as 9's (MINE) if they are among the cleared locations."""
+    if counts is None:
+        counts = setup_counts(mines, width, height)
+    size = width * height
+    cleared = _to_flags(cleared, size)
+    mines = _to_flags(mines, size)
+    planes = [_to_flags(plane, size) for plane in counts]
+    values = [-1 if cleared[i] == '0' else MINE if mines[i] == '1' else
+              sum(1 << bit for bit in range(4) if planes[bit][i] == '1')
+              for i in range(size)]
+    return [values[y * width:(y + 1) * width] for y in range(height)]
+
+
+def reveal_board(mines, width, height):
+    """All mines and counts as list of lists, as from setup_counts."""
+    return to_board((1 << (width * height)) - 1, mines, width, height)
+
+
+class BitboardGame:
+    """A single game with mines and cleared locations as integers, with the
+    same attributes and move() as minesweep.Game, apart from the board and
+    counts; use to_board() for the board."""
+
+    __slots__ = ('width', 'height', 'number_of_mines', 'seed', 'mines', 'counts', 'zeros',
+                 'cleared', 'covered', 'moves', 'result')
+
+    def __init__(self, width, height, number_of_mines, seed=None, mines=None):
+        self.width = width
+        self.height = height
+        self.number_of_mines = number_of_mines
+        self.seed = seed
+        if mines is None:
+            mines = setup_mines(width, height, number_of_mines, Random(seed))
+        self.mines = mines
+        self.counts = setup_counts(mines, width, height)
+        self.zeros = zeros(mines, width, height, self.counts)
+        self.cleared = setup_board(width, height)
+        self.covered = width * height
+        self.moves = 0
+        self.result = None
+
+    @property
+    def over(self):
+        return self.result is not None
+
+    def move(self, move):
+        """Apply a move; see minesweep.Game.move. Returns the newly cleared
+        locations as an integer."""
+        x, y = move
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError('Move ' + str(move) + ' is outside the board')
+        if self.result is not None:
+            return 0
+
+        self.moves += 1
+        if (self.mines >> (y * self.width + x)) & 1:
+            self.result = 'lost'
+            return 0
+
+        cleared = update_board(move, self.cleared, self.mines, self.width, self.height,
+                               self.counts, self.zeros)
+        revealed = cleared & ~self.cleared
+        self.cleared = cleared
+        # Winning means every location without a mine is cleared
+        self.covered = self.width * self.height - count_bits(cleared)
+        if self.covered == self.number_of_mines:
+            self.result = 'won'
+        return revealed
+
+    def to_board(self):
+        return to_board(self.cleared, self.mines, self.width, self.height, self.counts)
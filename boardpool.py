@@ -0,0 +1,147 @@
+"""
+Boards that are safe on the first move and can be solved without guessing,
+and a pool that keeps them ready so a game can start without waiting.
+"""
+from collections import deque
+from random import Random
+import threading
+import time
+
+from minesweep import Game
+from solver import Solver
+
+
+def generate_board(width, height, number_of_mines, rng=None, no_guess=True, time_limit=5.0):
+    """Set up mines so that a start location and its neighbours are free of
+    mines, which makes the start location clear an area. With no_guess, keep
+    trying until the solver can clear the whole board from the start location
+    without guessing; for at most time_limit seconds (None for no limit), as
+    dense boards hardly ever, or never, can be. Raises ValueError if no such
+    board was found in time; there is always one try, also with a time_limit
+    of 0. Returns the mines (as from setup_mines) and the start location."""
+    rng = rng or Random()
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    while True:
+        start = (rng.randrange(width), rng.randrange(height))
+        free = {(x, y) for x in range(start[0] - 1, start[0] + 2)
+                for y in range(start[1] - 1, start[1] + 2)}
+        if width * height - len(free) < number_of_mines:
+            # Not enough room to keep all neighbours free; only keep the start free
+            free = {start}
+        candidates = [mine for mine in range(width * height)
+                      if (mine % width, mine // width) not in free]
+        mines = [(mine % width, mine // width)
+                 for mine in rng.sample(candidates, number_of_mines)]
+        if not no_guess or solvable(width, height, number_of_mines, mines, start):
+            return mines, start
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ValueError('No board of {0}x{1} with {2} mines found that can be solved '
+                             'without guessing'.format(width, height, number_of_mines))
+
+
+def solvable(width, height, number_of_mines, mines, start):
+    """True if the solver can clear the whole board from the start location,
+    without guessing."""
+    game = Game(width, height, number_of_mines, mines=mines)
+    solver = Solver(game.board)
+    solver.update(game.move(start))
+    while not game.over:
+        safe, _ = solver.solve()
+        if not safe:
+            return False
+        solver.update(game.move(safe.pop()))
+    return game.result == 'won'
+
+
+class BoardPool:
+    """Keeps a number of boards ready for every (width, height, number_of_mines)
+    that has been asked for, filled up by a background thread. Generating boards
+    without guessing can take a while for dense boards, but with the pool a game
+    can start immediately; unless the pool for that size has run empty.
+    Sizes for which no board without guessing is found within time_limit
+    seconds are given up on: from then on they get boards that are only safe on
+    the first move, generated when asked for."""
+
+    def __init__(self, boards_per_size=8, no_guess=True, seed=None, time_limit=2.0):
+        self.boards_per_size = boards_per_size
+        self.no_guess = no_guess
+        self.time_limit = time_limit
+        self.rng = Random(seed)
+        # Ready boards per (width, height, number_of_mines)
+        self.boards = {}
+        # Sizes given up on, see above
+        self.given_up = set()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def prepare(self, width, height, number_of_mines):
+        """Start filling the pool for a size, before any board is asked for."""
+        with self.condition:
+            self.boards.setdefault((width, height, number_of_mines), deque())
+            self.condition.notify()
+
+    def get(self, width, height, number_of_mines):
+        """Returns mines and start location for a new board (see generate_board);
+        from the pool if there is one ready, otherwise generated right away.
+        Within time_limit seconds, that is; otherwise the board is only safe on
+        the first move."""
+        key = (width, height, number_of_mines)
+        with self.condition:
+            ready = self.boards.setdefault(key, deque())
+            board = ready.popleft() if ready else None
+            no_guess = self.no_guess and key not in self.given_up
+            self.condition.notify()
+        if board is None:
+            rng = Random(self.rng.random())
+            try:
+                board = generate_board(width, height, number_of_mines, rng, no_guess,
+                                       self.time_limit)
+            except ValueError:
+                with self.condition:
+                    self.given_up.add(key)
+                board = generate_board(width, height, number_of_mines, rng, no_guess=False)
+        return board
+
+    def ready(self, width, height, number_of_mines):
+        """Number of boards ready for a size."""
+        with self.condition:
+            return len(self.boards.get((width, height, number_of_mines), ()))
+
+    def close(self):
+        """Stop the background thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _fill(self):
+        """Background thread: generate boards for sizes that are not full."""
+        while True:
+            with self.condition:
+                while not self.closed:
+                    key = next((key for key, ready in self.boards.items()
+                                if len(ready) < self.boards_per_size and
+                                key not in self.given_up), None)
+                    if key is not None:
+                        break
+                    self.condition.wait()
+                if self.closed:
+                    return
+                rng = Random(self.rng.random())
+            # Generate without holding the lock, so get() is never kept waiting;
+            # one try at a time, so close() doesn't have to wait for long
+            board = None
+            deadline = time.monotonic() + self.time_limit
+            while board is None and not self.closed:
+                try:
+                    board = generate_board(*key, rng=rng, no_guess=self.no_guess, time_limit=0)
+                except ValueError:
+                    if time.monotonic() >= deadline:
+                        break
+            with self.condition:
+                if board is not None:
+                    self.boards[key].append(board)
+                elif not self.closed:
+                    self.given_up.add(key)
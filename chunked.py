@@ -0,0 +1,142 @@
+"""
+Minesweeper on an unbounded board, which is split into square chunks.
+Mines for a chunk are only set up when a move first needs them, and come
+from the seed and the chunk coordinates, so they are the same no matter in
+which order chunks are explored. Memory use grows with the explored area,
+not with the size of the board.
+"""
+from random import Random
+
+from minesweep import MINE
+
+# Value for a location that has not been cleared yet
+COVERED = 255
+
+
+class ChunkedMinefield:
+    """Mines on an unbounded board. x and y can be any integer, including
+    negative ones."""
+
+    def __init__(self, seed, mines_per_chunk, chunk_size=32):
+        if not 0 <= mines_per_chunk < chunk_size * chunk_size:
+            raise ValueError('A chunk of ' + str(chunk_size * chunk_size) +
+                             ' locations cannot hold ' + str(mines_per_chunk) + ' mines')
+        self.seed = seed
+        self.mines_per_chunk = mines_per_chunk
+        self.chunk_size = chunk_size
+        # Mines per chunk, as a bytearray with 1 for a mine; only for chunks
+        # that have been needed so far
+        self.chunks = {}
+
+    def _chunk(self, cx, cy):
+        """Mines for the chunk with chunk coordinates cx, cy; set up on first use."""
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            size = self.chunk_size
+            rng = Random('{0}:{1}:{2}'.format(self.seed, cx, cy))
+            chunk = bytearray(size * size)
+            for mine in rng.sample(range(size * size), self.mines_per_chunk):
+                chunk[mine] = 1
+            self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def is_mine(self, location):
+        x, y = location
+        size = self.chunk_size
+        return self._chunk(x // size, y // size)[(y % size) * size + x % size] == 1
+
+    def count(self, location):
+        """Number of mines adjacent to a location; or 9 (MINE) for a mine."""
+        if self.is_mine(location):
+            return MINE
+        x, y = location
+        return sum(self.is_mine((ix, iy))
+                   for iy in range(y - 1, y + 2) for ix in range(x - 1, x + 2))
+
+
+class ChunkedGame:
+    """A game on an unbounded board. There is no winning; a game only ends by
+    hitting a mine. Which locations have been cleared is also kept per chunk,
+    only for chunks where something was cleared."""
+
+    def __init__(self, seed, mines_per_chunk, chunk_size=32, max_reveal=1000000):
+        """Start a new game. max_reveal limits the number of locations a single
+        move can clear, as an empty area on an unbounded board need not end;
+        the next move goes on clearing where the last one stopped."""
+        self.minefield = ChunkedMinefield(seed, mines_per_chunk, chunk_size)
+        self.chunk_size = chunk_size
+        self.max_reveal = max_reveal
+        # Board values per chunk, as a bytearray with COVERED or the count
+        self.board_chunks = {}
+        # Cleared zeros whose neighbours are still to be cleared, left over
+        # from a move that reached max_reveal
+        self.pending = []
+        self.moves = 0
+        # None while the game is still going, otherwise 'lost'
+        self.result = None
+
+    def value(self, location):
+        """Value on the board for a location: -1 if not cleared yet, otherwise
+        the number of adjacent mines. This never sets up any mines."""
+        x, y = location
+        size = self.chunk_size
+        chunk = self.board_chunks.get((x // size, y // size))
+        if chunk is None:
+            return -1
+        value = chunk[(y % size) * size + x % size]
+        return -1 if value == COVERED else value
+
+    def _clear(self, x, y):
+        """Clear a location, and return its count."""
+        size = self.chunk_size
+        key = (x // size, y // size)
+        chunk = self.board_chunks.get(key)
+        if chunk is None:
+            chunk = self.board_chunks[key] = bytearray([COVERED]) * (size * size)
+        count = self.minefield.count((x, y))
+        chunk[(y % size) * size + x % size] = count
+        return count
+
+    def move(self, move):
+        """Apply a move, in the same way as minesweep.Game.move. If an earlier
+        move stopped at max_reveal, this also goes on clearing that area; so a
+        move on an area that is already cleared only does that.
+        Returns list with the coordinates of all locations cleared by the move."""
+        if self.result is not None:
+            return []
+        self.moves += 1
+        if self.minefield.is_mine(move):
+            self.result = 'lost'
+            return []
+        if self.value(move) >= 0:
+            return self._expand([])
+
+        revealed = [move]
+        if self._clear(*move) == 0:
+            self.pending.append(move)
+        return self._expand(revealed)
+
+    def _expand(self, revealed):
+        """Clear the neighbours of the pending zeros (and of the zeros found
+        on the way), until there are none left or max_reveal locations have
+        been cleared. Returns revealed with the cleared locations added."""
+        stack = self.pending
+        while stack and len(revealed) < self.max_reveal:
+            x, y = stack.pop()
+            for iy in range(y - 1, y + 2):
+                for ix in range(x - 1, x + 2):
+                    if self.value((ix, iy)) < 0:
+                        revealed.append((ix, iy))
+                        if self._clear(ix, iy) == 0:
+                            stack.append((ix, iy))
+        return revealed
+
+    @property
+    def over(self):
+        return self.result is not None
+
+    def window(self, left, bottom, columns, rows):
+        """Part of the board as list of lists, as from setup_board, with
+        left, bottom as location 0, 0; for display_board."""
+        return [[self.value((x, y)) for x in range(left, left + columns)]
+                for y in range(bottom, bottom + rows)]
@@ -0,0 +1,133 @@
+"""
+A game that keeps its board in a single bytearray, with one byte per location,
+instead of lists of lists of ints for the board and the counts, plus the list
+of mines. That takes less than a tenth of the memory, for holding many games
+or very large boards.
+"""
+from random import Random
+
+from minesweep import MINE, setup_mines
+
+# Flag in a location's byte for locations not cleared yet. The rest of the
+# byte is the number of adjacent mines, or 9 (MINE) for a mine.
+COVERED = 0x10
+
+
+class CompactGame:
+    """A single game on the usual rectangle, with the attributes of
+    minesweep.Game and its move(); there is no board or counts as lists (use
+    value(), rows() or reveal_board() for those). Only single reveals are
+    supported: no flags, chords, batches of moves (play()), topologies or
+    regions, so it can't stand in for Game where those are used, as in the
+    server. Locations are stored per row, from y = 0 up."""
+
+    __slots__ = ('width', 'height', 'number_of_mines', 'seed', 'cells',
+                 'covered', 'moves', 'last_revealed', 'result')
+
+    def __init__(self, width, height, number_of_mines, seed=None, mines=None):
+        """Start a new game; see minesweep.Game."""
+        self.width = width
+        self.height = height
+        self.number_of_mines = number_of_mines
+        self.seed = seed
+        if mines is None:
+            mines = setup_mines(width, height, number_of_mines, Random(seed))
+        cells = bytearray([COVERED]) * (width * height)
+        for x, y in mines:
+            for iy in range(max(0, y - 1), min(height, y + 2)):
+                for ix in range(max(0, x - 1), min(width, x + 2)):
+                    cells[iy * width + ix] += 1
+        # Set the mines last, so they don't get incremented by neighbouring mines.
+        for x, y in mines:
+            cells[y * width + x] = COVERED | MINE
+        self.cells = cells
+        self.covered = width * height
+        self.moves = 0
+        self.last_revealed = []
+        self.result = None
+
+    @property
+    def mines(self):
+        """List with the coordinates of all mines, as from setup_mines."""
+        width = self.width
+        return [(i % width, i // width) for i, cell in enumerate(self.cells)
+                if cell & 0x0F == MINE]
+
+    @property
+    def over(self):
+        return self.result is not None
+
+    def is_mine(self, location):
+        return self.cells[location[1] * self.width + location[0]] & 0x0F == MINE
+
+    def count_adjacent_mines(self, move):
+        """Counts number of mines immediately adjacent to the coordinates of a move."""
+        x, y = move
+        return sum(self.is_mine((ix, iy))
+                   for iy in range(max(0, y - 1), min(self.height, y + 2))
+                   for ix in range(max(0, x - 1), min(self.width, x + 2)))
+
+    def value(self, location):
+        """Value on the board, as on the board from setup_board: -1 if not
+        cleared yet, otherwise the number of adjacent mines."""
+        cell = self.cells[location[1] * self.width + location[0]]
+        return -1 if cell & COVERED else cell
+
+    def rows(self):
+        """The board as list of lists, as from setup_board; for display_board."""
+        width = self.width
+        return [[-1 if cell & COVERED else cell for cell in self.cells[y * width:(y + 1) * width]]
+                for y in range(self.height)]
+
+    def reveal_board(self):
+        """All mines and counts as list of lists, as from setup_counts."""
+        width = self.width
+        return [[cell & 0x0F for cell in self.cells[y * width:(y + 1) * width]]
+                for y in range(self.height)]
+
+    def update_board(self, move):
+        """Clear a location in the same way as minesweep.update_board (after
+        having already checked that it is not a mine). Returns a list with the
+        coordinates of all newly cleared locations."""
+        cells = self.cells
+        width = self.width
+        height = self.height
+        x, y = move
+        i = y * width + x
+        if not cells[i] & COVERED:
+            return []
+        cells[i] &= ~COVERED
+        revealed = [move]
+        stack = [move] if cells[i] == 0 else []
+        while stack:
+            x, y = stack.pop()
+            for iy in range(max(0, y - 1), min(height, y + 2)):
+                row = iy * width
+                for ix in range(max(0, x - 1), min(width, x + 2)):
+                    if cells[row + ix] & COVERED:
+                        cells[row + ix] &= ~COVERED
+                        revealed.append((ix, iy))
+                        if cells[row + ix] == 0:
+                            stack.append((ix, iy))
+        return revealed
+
+    def move(self, move):
+        """Apply a move; see minesweep.Game.move."""
+        x, y = move
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError('Move ' + str(move) + ' is outside the board')
+        self.last_revealed = []
+        if self.result is not None:
+            return []
+
+        self.moves += 1
+        if self.is_mine(move):
+            self.result = 'lost'
+            return []
+
+        revealed = self.update_board(move)
+        self.last_revealed = revealed
+        self.covered -= len(revealed)
+        if self.covered == self.number_of_mines:
+            self.result = 'won'
+        return revealed
@@ -0,0 +1,244 @@
+"""
+Exact mine probabilities for the covered locations of a board, for hints.
+"""
+from functools import lru_cache
+from math import comb
+
+from solver import neighbours
+
+
+@lru_cache(maxsize=None)
+def _comb(n, k):
+    """Number of ways to hide k mines in n locations; remembered, because the
+    same few values are needed over and over."""
+    if k < 0 or k > n:
+        return 0
+    return comb(n, k)
+
+
+def _convolve(first, second):
+    """Combine two lists of weights per number of mines into one."""
+    combined = [0] * (len(first) + len(second) - 1)
+    for i, a in enumerate(first):
+        if a:
+            for j, b in enumerate(second):
+                combined[i + j] += a * b
+    return combined
+
+
+def _components(board):
+    """Split the covered locations next to cleared counts (the frontier) into
+    groups that don't share any count. Returns the groups, each as a tuple of
+    (locations, constraints) where a constraint is (mines, locations), and the
+    list of all other covered locations."""
+    height = len(board)
+    width = len(board[0])
+    parent = {}
+
+    def find(location):
+        while parent[location] != location:
+            parent[location] = parent[parent[location]]
+            location = parent[location]
+        return location
+
+    constraints = []
+    for y in range(height):
+        for x in range(width):
+            if board[y][x] > 0:
+                covered = [(ix, iy) for ix, iy in neighbours(x, y, width, height)
+                           if board[iy][ix] < 0]
+                if covered:
+                    constraints.append((board[y][x], covered))
+                    for location in covered:
+                        parent.setdefault(location, location)
+                    for location in covered[1:]:
+                        parent[find(location)] = find(covered[0])
+
+    groups = {}
+    for constraint in constraints:
+        groups.setdefault(find(constraint[1][0]), []).append(constraint)
+    components = []
+    for group in groups.values():
+        locations = sorted({location for _, covered in group for location in covered})
+        components.append((locations, group))
+
+    interior = [(x, y) for y in range(height) for x in range(width)
+                if board[y][x] < 0 and (x, y) not in parent]
+    return components, interior
+
+
+def _count_component(locations, constraints):
+    """Count all ways to place mines in the locations of one group that agree
+    with its counts, per number of mines. This is a sweep over the locations
+    in order, rather than trying every placement: between two locations, only
+    the mines still needed by the counts that have some of their locations on
+    either side (the open counts) matter for what can come next. So for every
+    such state, the ways to get there are kept per number of mines placed so
+    far; that stays small for a frontier, even with thousands of locations.
+    Returns the ways per number of mines, and the sweep, for _mine_weights."""
+    # Order the locations so each count gets complete as early as possible,
+    # which keeps the number of open counts small.
+    index = {}
+    for _, covered in constraints:
+        for location in covered:
+            index.setdefault(location, len(index))
+    order = sorted(locations, key=index.get)
+    position = {location: i for i, location in enumerate(order)}
+
+    size = len(order)
+    positions = [sorted(position[location] for location in covered)
+                 for _, covered in constraints]
+    # For every location, its counts with the number of their locations after it
+    location_constraints = [[] for _ in order]
+    for c, covered in enumerate(positions):
+        for k, i in enumerate(covered):
+            location_constraints[i].append((c, len(covered) - k - 1))
+
+    # The state before every location is the number of mines still needed by
+    # each open count, in the order of open_counts. Work out once per location
+    # where its counts are in the state, which ones stay open after it, and
+    # which ones it opens.
+    plans = []
+    open_counts = []
+    for i in range(size):
+        where = {c: j for j, c in enumerate(open_counts)}
+        touched = [(where.get(c), c, left) for c, left in location_constraints[i]]
+        closing = {c for c, left in location_constraints[i] if left == 0}
+        keep = [j for j, c in enumerate(open_counts) if c not in closing]
+        opening = [c for c, left in location_constraints[i] if c not in where and left > 0]
+        plans.append((touched, keep, opening))
+        open_counts = [open_counts[j] for j in keep] + opening
+
+    def step(i, state, mine):
+        """The state after location i, with or without a mine on it; or None
+        if that can't agree with the counts."""
+        touched, keep, opening = plans[i]
+        needed = list(state)
+        opened = {}
+        for j, c, left in touched:
+            remaining = (constraints[c][0] if j is None else needed[j]) - mine
+            if remaining < 0 or remaining > left:
+                return None
+            if j is None:
+                opened[c] = remaining
+            else:
+                needed[j] = remaining
+        return tuple([needed[j] for j in keep] + [opened[c] for c in opening])
+
+    # layers[i] has, for every state before location i, the ways to reach it
+    # per number of mines so far; as the lowest number of mines, and a list
+    # of ways from there on, as only a narrow range of numbers is possible.
+    layers = [{(): (0, [1])}]
+    for i in range(size):
+        layer = {}
+        for state, (low, ways) in layers[i].items():
+            for mine in (0, 1):
+                after = step(i, state, mine)
+                if after is None:
+                    continue
+                if after not in layer:
+                    layer[after] = (low + mine, list(ways))
+                    continue
+                other_low, other = layer[after]
+                low_after = min(other_low, low + mine)
+                combined = [0] * (max(other_low + len(other), low + mine + len(ways)) - low_after)
+                for k, w in enumerate(other):
+                    combined[other_low - low_after + k] += w
+                for k, w in enumerate(ways):
+                    combined[low + mine - low_after + k] += w
+                layer[after] = (low_after, combined)
+        layers.append(layer)
+
+    ways = [0] * (size + 1)
+    if () in layers[size]:
+        low, counted = layers[size][()]
+        ways[low:low + len(counted)] = counted
+    return ways, (order, layers, step)
+
+
+def _mine_weights(sweep, weight):
+    """For every location of a group, the ways that have a mine on it, each
+    weighted by weight[number of mines in the group]. Goes back over the sweep
+    from _count_component, keeping per state the weighted ways to complete it
+    for every number of mines it can be reached with; so the number of mines
+    never needs to be combined from both sides."""
+    order, layers, step = sweep
+    size = len(order)
+    weight = weight + [0] * (size + 2 - len(weight))
+    # completions[state][m - low]: weighted ways to finish from a state, with
+    # m mines before it, for the same numbers of mines as in its layer
+    low, ways = layers[size].get((), (0, []))
+    completions = {(): weight[low:low + len(ways)]}
+    mine_weights = {}
+    for i in range(size - 1, -1, -1):
+        previous = {}
+        with_mine = 0
+        after_layer = layers[i + 1]
+        for state, (low, ways) in layers[i].items():
+            total = [0] * len(ways)
+            for mine in (0, 1):
+                after = step(i, state, mine)
+                finish = completions.get(after)
+                if finish is None:
+                    continue
+                offset = low + mine - after_layer[after][0]
+                for m in range(len(ways)):
+                    total[m] += finish[m + offset]
+                if mine:
+                    with_mine += sum(w * finish[m + offset] for m, w in enumerate(ways))
+            previous[state] = total
+        mine_weights[order[i]] = with_mine
+        completions = previous
+    return mine_weights
+
+
+def mine_probabilities(board, number_of_mines):
+    """Returns a dict with the exact probability of a mine for every covered
+    location on the board, given everything visible and the total number of mines.
+    The frontier is split into groups that don't share any count, and each group
+    is counted by itself; the groups are then combined per number of mines, so
+    the work doesn't grow with the product of the number of ways in all groups."""
+    components, interior = _components(board)
+    counted = [_count_component(locations, constraints)
+               for locations, constraints in components]
+
+    # Ways per number of mines for all groups together, and for all groups but one
+    before = [[1]]
+    for ways, _ in counted:
+        before.append(_convolve(before[-1], ways))
+    after = [[1]]
+    for ways, _ in reversed(counted):
+        after.append(_convolve(after[-1], ways))
+    after.reverse()
+    total_ways = before[-1]
+
+    # Remaining mines go anywhere in the interior
+    spare = len(interior)
+    total = sum(w * _comb(spare, number_of_mines - k) for k, w in enumerate(total_ways))
+    if total == 0:
+        raise ValueError('The board does not match the number of mines')
+
+    probabilities = {}
+    for c, (ways, sweep) in enumerate(counted):
+        others = _convolve(before[c], after[c + 1])
+        # Weight of every number of mines in this group, given all other groups
+        weight = [sum(w * _comb(spare, number_of_mines - k - j) for j, w in enumerate(others))
+                  for k in range(len(ways))]
+        for location, weighted in _mine_weights(sweep, weight).items():
+            probabilities[location] = weighted / total
+
+    if interior:
+        interior_probability = sum(
+            w * _comb(spare - 1, number_of_mines - k - 1)
+            for k, w in enumerate(total_ways)) / total
+        for location in interior:
+            probabilities[location] = interior_probability
+    return probabilities
+
+
+def hint(board, number_of_mines):
+    """Returns the covered location with the lowest probability of a mine,
+    and that probability."""
+    probabilities = mine_probabilities(board, number_of_mines)
+    location = min(probabilities, key=probabilities.get)
+    return location, probabilities[location]
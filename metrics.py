@@ -0,0 +1,65 @@
+"""
+Measurements per move for play_game: how long a move takes, how much of that
+is displaying the board, and how much work update_board did for it.
+"""
+import time
+
+
+class GameMetrics:
+    """Collects a record for every move of a game. Pass it to play_game as
+    metrics; without it play_game doesn't measure anything.
+    Every record is a dict with:
+    - seconds: time from applying the move up to and including displaying it
+    - render_seconds: the part of that spent on displaying the board
+    - revealed: number of locations cleared by update_board
+    - neighbours_checked: number of neighbouring locations update_board checked
+    - largest_stack: largest number of locations waiting on update_board's stack
+    A callback, if given, is called with every record as soon as the move is done."""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.records = []
+        # Collected by update_board for the current move
+        self.stats = None
+        self._move_start = None
+        self._render_start = None
+
+    def start_move(self):
+        self.stats = {'revealed': 0, 'neighbours_checked': 0, 'largest_stack': 0}
+        self._render_start = None
+        self._move_start = time.perf_counter()
+
+    def start_render(self):
+        self._render_start = time.perf_counter()
+
+    def end_move(self):
+        now = time.perf_counter()
+        record = dict(self.stats)
+        record['seconds'] = now - self._move_start
+        record['render_seconds'] = 0.0 if self._render_start is None else now - self._render_start
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self):
+        """Dict with totals over all moves so far, plus the average and longest
+        time per move."""
+        records = self.records
+        moves = len(records)
+        seconds = sum(record['seconds'] for record in records)
+        return {
+            'moves': moves,
+            'seconds': seconds,
+            'average_seconds': seconds / moves if moves else 0.0,
+            'longest_seconds': max((record['seconds'] for record in records), default=0.0),
+            'render_seconds': sum(record['render_seconds'] for record in records),
+            'revealed': sum(record['revealed'] for record in records),
+            'neighbours_checked': sum(record['neighbours_checked'] for record in records),
+            'largest_stack': max((record['largest_stack'] for record in records), default=0),
+        }
+
+    def format_summary(self):
+        return ('{moves} moves in {seconds:.4f} seconds (average {average_seconds:.6f}, '
+                'longest {longest_seconds:.6f}), of which {render_seconds:.4f} displaying; '
+                '{revealed} locations cleared, {neighbours_checked} neighbours checked, '
+                'largest stack {largest_stack}.'.format(**self.summary()))
@@ -1,9 +1,21 @@
 """
 A minesweeper game without a GUI.
 """
-from random import sample
-import os
+import argparse
+from array import array
+import json
+from random import Random, sample
+import re
+import shutil
 import sys
+import time
+
+from topology import TOPOLOGIES, neighbour_table, neighbours
+
+# Value used in a count grid (and on a revealed board) to mark a mine.
+MINE = 9
+# Value on the board for a covered location that the player has flagged as a mine
+FLAG = -2
 
 
 def get_single_input(prompt, min_value, max_value):
@@ -22,7 +34,7 @@ def get_single_input(prompt, min_value, max_value):
             print('You should have entered a number. Please try again.')
 
 
-def get_game_parameters(max_width=76, max_height=20):
+def get_game_parameters(max_width=9999, max_height=9999):
     """Get and validate size parameters for the game."""
     # Minimums are hard coded below. Could be included in parameters above,
     # or perhaps even defined as globals somehow, but seems unnecessary.
@@ -38,16 +50,46 @@ def get_game_parameters(max_width=76, max_height=20):
     return width, height, number_of_mines
 
 
-def setup_mines(width, height, number_of_mines):
+def setup_mines(width, height, number_of_mines, rng=None):
     """Set up the 2-dimensional lists with mines.
-    Output is mines in list of tuples with coordinates (x,y)"""
+    Output is mines in list of tuples with coordinates (x,y)
+    Pass in a random.Random as rng to get a reproducible set of mines."""
     # First, create 1-dimensional list of random mines
-    random_mines = sample(range(width * height), number_of_mines)
+    random_mines = (rng.sample if rng else sample)(range(width * height), number_of_mines)
     # translate the 1-dimensional list into a list with x,y coordinates for each mine
     mines = [(mine % width, mine // width) for mine in random_mines]
     return mines
 
 
+def setup_counts(mines, width, height, topology=None, table=None):
+    """Set up the 2-dimensional list with the number of adjacent mines for every
+    location, with y as first sub-script and x as second subscript. Mines themselves
+    are indicated as 9's (MINE). This is done in a single pass over the mines, so
+    afterwards both the mine check and the counts are simple lookups.
+    With a topology (see topology.py) the neighbours come from its table,
+    otherwise the board is the usual rectangle. Pass in the table from
+    neighbour_table if it is at hand, to not look it up again."""
+    if topology is not None:
+        starts, table = table or neighbour_table(topology, width, height)
+        flat = [0] * (width * height)
+        for x, y in mines:
+            i = y * width + x
+            for neighbour in table[starts[i]:starts[i + 1]]:
+                flat[neighbour] += 1
+        counts = [flat[y * width:(y + 1) * width] for y in range(height)]
+    else:
+        counts = [[0 for x in range(width)] for y in range(height)]
+        for x, y in mines:
+            for iy in range(max(0, y - 1), min(height, y + 2)):
+                row = counts[iy]
+                for ix in range(max(0, x - 1), min(width, x + 2)):
+                    row[ix] += 1
+    # Set the mines last, so they don't get incremented by neighbouring mines.
+    for x, y in mines:
+        counts[y][x] = MINE
+    return counts
+
+
 def setup_board(width, height):
     """Set up the initial board to display. Output is board in 2-dimensional list form,
      with y as first sub-script and x as second subscript."""
@@ -57,62 +99,406 @@ def setup_board(width, height):
     return board
 
 
-def display_board(board):
-    """Print the board with x and y axis in human counting form."""
-    def print_x_coordinate_singles(widthp1):
-        print('  x|', end="")
-        for xp1 in range(1, widthp1):
-            print(' ' + str(xp1 % 10), end="")
-        print(' |')
-
-    def print_x_coordinate_tens(widthp1):
-        print('   |', end="")
-        for xp1 in range(1, widthp1):
-            if xp1 % 10 == 0:
-                print(' ' + str(xp1 // 10), end="")
-            else:
-                print('  ', end="")
-        print(' |')
-
-    os.system('clear')
-    print_x_coordinate_tens(len(board[0]) + 1)
-    print_x_coordinate_singles(len(board[0]) + 1)
-    print('-' * (2 * len(board[0]) + 8))
-
-    for y in range(len(board) - 1, -1, -1):
-        print('y{0:2}|'.format(y + 1), end="")
-        for x in range(len(board[0])):
-            # negative numbers mean not yet cleared
-            if board[y][x] < 0:
-                print(' #', end="")
-            elif board[y][x] == 0:
-                # Print middle dot (unicode) for zeros
-                print(' \u00B7', end="")
-            else:
-                print(' ' + str(board[y][x]), end="")
-        print(' |{0:2}y'.format(y + 1))
-
-    print('-' * (2 * len(board[0]) + 8))
-    print_x_coordinate_singles(len(board[0]) + 1)
-    print_x_coordinate_tens(len(board[0]) + 1)
+# Runs of zeros, and single numbers, in a row of counts as bytes
+ZEROS = re.compile(b'\\x00+')
+NUMBERS = re.compile(b'[^\\x00]')
+
+
+class Regions:
+    """Index of the areas that a single move clears: every connected area of
+    zeros (diagonals count as connected), together with the numbers around it.
+    Set up once from the counts; after that update_board can clear a whole area
+    by looking it up, instead of checking all the neighbours of every zero.
+    Locations are kept as index y * width + x in arrays of C integers, which
+    takes a few bytes per location rather than a tuple each.
+    - labels: array with the number of the area of every zero, or -1 for
+      locations that are not zeros
+    - locations: array with the locations of all areas, one area after another;
+      area number a goes from offsets[a] up to (but not including) offsets[a + 1]
+    - isolated: number of locations with a number that don't border any zero
+    len() gives the number of areas.
+    With a topology (see topology.py) the areas follow its neighbours instead;
+    pass in the table from neighbour_table if it is at hand."""
+
+    __slots__ = ('width', 'labels', 'locations', 'offsets', 'isolated')
+
+    def __init__(self, counts, width, height, topology=None, table=None):
+        self.width = width
+        self.labels = array('i', [-1]) * (width * height)
+        if topology is not None:
+            areas = self._from_table(counts, width, height,
+                                     table or neighbour_table(topology, width, height))
+        else:
+            areas = self._from_runs(counts, width, height)
+        self.locations = array('i')
+        self.offsets = array('i', [0])
+        for area in areas:
+            # Numbers next to more than one zero of an area are in there more than once
+            self.locations.extend(dict.fromkeys(area))
+            self.offsets.append(len(self.locations))
+
+    def _from_runs(self, counts, width, height):
+        """Set up the areas on the usual rectangle; returns an array with the
+        locations of every area, with some numbers more than once."""
+        # Work with runs of zeros on a row rather than single locations, which
+        # are found with a regular expression on the row as bytes; and join
+        # runs that touch a run on the row below with union-find.
+        rows = [bytes(row) for row in counts]
+        runs = []
+        row_runs = []
+        for y in range(height):
+            row_runs.append([])
+            for match in ZEROS.finditer(rows[y]):
+                row_runs[y].append(len(runs))
+                runs.append((y, match.start(), match.end()))
+        parent = list(range(len(runs)))
+
+        def find(i):
+            while parent[i] != i:
+                # Path halving: point to the grandparent on the way up
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for y in range(1, height):
+            below = row_runs[y - 1]
+            j = 0
+            for i in row_runs[y]:
+                _, start, end = runs[i]
+                # Skip runs below that end left of this one, diagonals included
+                while j < len(below) and runs[below[j]][2] < start:
+                    j += 1
+                k = j
+                while k < len(below) and runs[below[k]][1] <= end:
+                    root_i = find(i)
+                    root_k = find(below[k])
+                    if root_i != root_k:
+                        parent[root_k] = root_i
+                    k += 1
+
+        # Number the areas in order of their first run, and collect their
+        # zeros and the numbers around them (which can't be mines, as they
+        # are next to a zero).
+        numbers = {}
+        labels = self.labels
+        areas = []
+        border = [bytearray(width) for y in range(height)]
+        for i, (y, start, end) in enumerate(runs):
+            root = find(i)
+            label = numbers.get(root)
+            if label is None:
+                label = numbers[root] = len(areas)
+                areas.append(array('i'))
+            first = y * width
+            labels[first + start:first + end] = array('i', [label]) * (end - start)
+            area = areas[label]
+            area.extend(range(first + start, first + end))
+            left = max(0, start - 1)
+            right = min(width, end + 1)
+            for iy in range(max(0, y - 1), min(height, y + 2)):
+                row_first = iy * width
+                area.extend(row_first + match.start()
+                            for match in NUMBERS.finditer(rows[iy], left, right))
+                border[iy][left:right] = b'\x01' * (right - left)
+        # All locations without a mine, apart from the zeros and the numbers around them
+        self.isolated = (width * height - sum(row.count(MINE) for row in counts) -
+                         sum(row.count(1) for row in border))
+        return areas
+
+    def _from_table(self, counts, width, height, table):
+        """Set up the areas with union-find on single zeros, joining every zero
+        with the neighbours in the table that have been visited already."""
+        starts, table = table
+        flat = [count for row in counts for count in row]
+        # Parent of every zero, or -1 for locations that are not (yet) visited
+        parent = array('i', [-1]) * len(flat)
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        zeros = [i for i, count in enumerate(flat) if count == 0]
+        for i in zeros:
+            parent[i] = i
+            for neighbour in table[starts[i]:starts[i + 1]]:
+                if parent[neighbour] != -1:
+                    root = find(neighbour)
+                    if root != find(i):
+                        parent[root] = find(i)
+
+        numbers = {}
+        areas = []
+        border = set()
+        for i in zeros:
+            root = find(i)
+            label = numbers.get(root)
+            if label is None:
+                label = numbers[root] = len(areas)
+                areas.append(array('i'))
+            self.labels[i] = label
+            area = areas[label]
+            area.append(i)
+            for neighbour in table[starts[i]:starts[i + 1]]:
+                if flat[neighbour] != 0:
+                    area.append(neighbour)
+                    border.add(neighbour)
+        self.isolated = width * height - flat.count(MINE) - len(zeros) - len(border)
+        return areas
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def label(self, location):
+        """Number of the area of a zero, or -1 if the location is not a zero."""
+        return self.labels[location[1] * self.width + location[0]]
+
+    def area(self, label):
+        """List with the coordinates of all locations in an area."""
+        width = self.width
+        return [(i % width, i // width)
+                for i in self.locations[self.offsets[label]:self.offsets[label + 1]]]
+
+    @property
+    def three_bv(self):
+        """Smallest number of moves needed to clear the board (Bechtel's Board
+        Benchmark Value): one per area of zeros, plus one per number that
+        doesn't border any zero."""
+        return len(self) + self.isolated
+
+
+def _cell_text(value):
+    """Text for a single location on the board."""
+    # negative numbers mean not yet cleared
+    if value == FLAG:
+        return 'F'
+    if value < 0:
+        return '#'
+    if value == 0:
+        # Middle dot (unicode) for zeros
+        return '\u00B7'
+    return str(value)
+
+
+class Viewport:
+    """The part of the board that is displayed, for boards that don't fit on
+    the screen. left and bottom are the computer coordinates of the lower left
+    location shown; columns and rows are the number of locations shown."""
+
+    def __init__(self, width, height, columns=None, rows=None):
+        self.width = width
+        self.height = height
+        self.columns = max(1, min(width, columns or width))
+        self.rows = max(1, min(height, rows or height))
+        self.left = 0
+        self.bottom = 0
+
+    @classmethod
+    def for_terminal(cls, width, height):
+        """Viewport as large as fits in the current terminal; leaving room for
+        the coordinates around the board and, below it, for a message and the
+        prompt for moves with an entry (which can wrap over several lines).
+        Otherwise the terminal would scroll, and redrawing only the changes
+        would put them on the wrong lines."""
+        size = shutil.get_terminal_size()
+        columns = (size.columns - 2 * _label_width(height) - 5) // 2
+        # Lines for the prompt and entry, plus one for a message and one for
+        # the cursor after the entry
+        below = -(-(len(MOVES_PROMPT) + ENTRY_ROOM) // max(1, size.columns)) + 2
+        rows = size.lines - 2 * (_x_label_rows(width) + 1) - below
+        return cls(width, height, columns, rows)
+
+    def contains(self, location):
+        x, y = location
+        return (self.left <= x < self.left + self.columns and
+                self.bottom <= y < self.bottom + self.rows)
+
+    def scroll(self, dx, dy):
+        """Move the viewport, without moving past the edges of the board."""
+        self.left = max(0, min(self.width - self.columns, self.left + dx))
+        self.bottom = max(0, min(self.height - self.rows, self.bottom + dy))
+
+    def follow(self, location):
+        """Center the viewport on a location if it was not shown.
+        Returns True if the viewport moved."""
+        if self.contains(location):
+            return False
+        self.scroll(location[0] - self.columns // 2 - self.left,
+                    location[1] - self.rows // 2 - self.bottom)
+        return True
+
+
+def _label_width(height):
+    """Number of characters needed for the y coordinates; at least 2."""
+    return max(2, len(str(height)))
+
+
+def _x_label_rows(width):
+    """Number of lines needed for the x coordinates, one per digit; at least 2."""
+    return max(2, len(str(width)))
+
+
+def format_board(board, viewport=None, topology=None):
+    """Build the board with x and y axis in human counting form, as a single
+    string (without a final newline). With a viewport, only the part of the
+    board inside the viewport is included. On a hexagonal board (see
+    topology.py) every odd row is shifted one character to the right."""
+    if viewport is None:
+        viewport = Viewport(len(board[0]), len(board))
+    left = viewport.left
+    right = left + viewport.columns
+    label = _label_width(len(board))
+    y_label = 'y{0:' + str(label) + '}|'
+    y_label_right = ' |{0:' + str(label) + '}y'
+    shift = ' ' if topology == 'hexagonal' else ''
+
+    def x_coordinate_singles():
+        return (' ' * label + 'x|' +
+                ''.join(' ' + str(xp1 % 10) for xp1 in range(left + 1, right + 1)) + shift + ' |')
+
+    def x_coordinate_digit(power):
+        # Tens, hundreds, ...: written above (and below) every tenth column,
+        # so the digits of those columns can be read from top to bottom
+        return (' ' * (label + 1) + '|' +
+                ''.join(' ' + str(xp1 // power % 10) if xp1 % 10 == 0 and xp1 >= power else '  '
+                        for xp1 in range(left + 1, right + 1)) + shift + ' |')
+
+    higher = [x_coordinate_digit(10 ** digit)
+              for digit in range(_x_label_rows(len(board[0])) - 1, 0, -1)]
+    dashes = '-' * (2 * viewport.columns + 2 * label + 4 + len(shift))
+    lines = higher + [x_coordinate_singles(), dashes]
+    for y in range(viewport.bottom + viewport.rows - 1, viewport.bottom - 1, -1):
+        lines.append(y_label.format(y + 1) + (shift if y % 2 else '') +
+                     ''.join(' ' + _cell_text(value) for value in board[y][left:right]) +
+                     ('' if y % 2 else shift) + y_label_right.format(y + 1))
+    lines += [dashes, x_coordinate_singles()] + higher[::-1]
+    return '\n'.join(lines)
+
+
+# ANSI escape codes to clear the terminal, and to move the cursor to a line and column
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+CURSOR_TO = '\x1b[{0};{1}H'
+CLEAR_TO_END = '\x1b[J'
+
+
+def format_changes(board, changed, viewport=None, topology=None):
+    """Build the ANSI codes to redraw only the changed locations of a board
+    that was fully displayed before (with the same viewport), followed by
+    putting the cursor back on the line below the board (clearing everything
+    from there). Changes outside the viewport are skipped."""
+    if viewport is None:
+        viewport = Viewport(len(board[0]), len(board))
+    top = viewport.bottom + viewport.rows - 1
+    label = _label_width(len(board))
+    # The top row of the board is on the line below the x coordinates and the
+    # dashes, and each location takes 2 columns after the columns for the y
+    # coordinate.
+    header = _x_label_rows(len(board[0])) + 1
+    hexagonal = topology == 'hexagonal'
+    parts = [CURSOR_TO.format(top - y + header + 1, 2 * (x - viewport.left) + label + 4 +
+                              (y % 2 if hexagonal else 0)) +
+             _cell_text(board[y][x])
+             for x, y in changed if viewport.contains((x, y))]
+    parts.append(CURSOR_TO.format(viewport.rows + 2 * header + 1, 1) + CLEAR_TO_END)
+    return ''.join(parts)
+
+
+def display_board(board, changed=None, viewport=None, topology=None):
+    """Print the board with x and y axis in human counting form.
+    Without changes, the screen is cleared and the whole board is printed.
+    With a list of changed locations, only those are redrawn; which assumes
+    the whole board was displayed before. Either way, everything is written in
+    one go, to avoid flickering. With a viewport, only that part of the board
+    is displayed. The topology is passed on to format_board."""
+    if changed is None:
+        frame = CLEAR_SCREEN + format_board(board, viewport, topology) + '\n'
+    else:
+        frame = format_changes(board, changed, viewport, topology)
+    sys.stdout.write(frame)
+    sys.stdout.flush()
+
+
+# Entries to scroll the board, with the direction to scroll in
+SCROLL_KEYS = {'w': (0, 1), 'a': (-1, 0), 's': (0, -1), 'd': (1, 0)}
+
+MOVES_PROMPT = ('Enter x and y coordinates for next moves, separated by spaces; ' +
+                'f x y to flag, c x y to chord; w a s d to scroll; or  q  to exit: ')
+# Number of characters kept free for an entry after the prompt, see Viewport.for_terminal
+ENTRY_ROOM = 40
+
+
+def get_moves():
+    """Gets player input for a batch of moves, and returns list with a tuple
+    (kind, (x, y)) for every move, with coordinates for computer; where kind is
+    'reveal', 'flag' (or unflag) or 'chord'. See parse_moves for the entry.
+    Entries to scroll the board (w, a, s, d) are returned as they are."""
+    entry = input(MOVES_PROMPT)
+    if entry.lower() == 'q':
+        print('Thanks for playing; exiting program now.')
+        sys.exit()
+    if entry.lower() in SCROLL_KEYS:
+        return entry.lower()
+    return parse_moves(entry)
+
+
+# Words in a batch of moves that change what the coordinates after them do
+MOVE_KINDS = {'f': 'flag', 'c': 'chord', 'r': 'reveal'}
+
+
+def parse_moves(entry):
+    """Turns an entry with any number of x and y coordinates in human counting
+    form into list of (kind, (x, y)) with coordinates for computer. Coordinates
+    are revealed, unless they follow f (flag or unflag) or c (chord); r goes
+    back to revealing. So '3 4 5 6 f 1 1 2 2 c 4 4' reveals 2 locations, flags
+    2 and chords 1. Raises ValueError for anything else."""
+    moves = []
+    kind = 'reveal'
+    numbers = []
+    for word in entry.lower().split():
+        if word in MOVE_KINDS:
+            if numbers:
+                raise ValueError('x coordinate without y coordinate')
+            kind = MOVE_KINDS[word]
+            continue
+        numbers.append(int(word) - 1)
+        if len(numbers) == 2:
+            moves.append((kind, tuple(numbers)))
+            numbers = []
+    if numbers or not moves:
+        raise ValueError('Coordinates need to come in pairs of x and y')
+    return moves
 
 
 def get_move():
     """Gets player input, without validation or checks, and returns tuple
-    with x and y coordinate for computer; i.e. human entry - 1"""
-    move = input('Enter x and y coordinates for next move, separated by space; or  q  to exit: ')
+    with x and y coordinate for computer; i.e. human entry - 1
+    Entries to scroll the board (w, a, s, d) are returned as they are."""
+    move = input('Enter x and y coordinates for next move, separated by space; ' +
+                 'w a s d to scroll; or  q  to exit: ')
     if move.lower() == 'q':
         print('Thanks for playing; exiting program now.')
         sys.exit()
-    move = move.split()
+    if move.lower() in SCROLL_KEYS:
+        return move.lower()
+    return parse_move(move)
+
+
+def parse_move(entry):
+    """Turns an entry of x and y coordinates in human counting form, separated
+    by space, into a tuple with x and y coordinate for computer."""
+    move = entry.split()
     return int(move[0]) - 1, int(move[1]) - 1
 
 
-def count_adjacent_mines(move, mines, width, height):
-    """Counts number of mines immediately adjacent to the coordinates of a move"""
+def count_adjacent_mines(move, mines, width, height, topology=None):
+    """Counts number of mines immediately adjacent to the coordinates of a move;
+    with a topology, adjacent as in its table (see topology.py)"""
     count = 0
     x = move[0]
     y = move[1]
+    if topology is not None:
+        return sum(location in mines for location in neighbours(topology, x, y, width, height))
 
     # Statement below does redundant check for x,y as well
     # (we already checked that's not a mine) but so be it.
@@ -131,80 +517,470 @@ def reveal_board(mines, width, height):
     Mines will be indicated as 9's.
     This function does not change the actual board. Instead it sets up a
     temporary board and displays all the mines and surrounding counts on that."""
-    reveal = setup_board(width, height)
-    for x in range(width):
-        for y in range(height):
-            if (x, y) in mines:
-                reveal[y][x] = 9
-            else:
-                reveal[y][x] = count_adjacent_mines((x, y), mines, width, height)
-
-    display_board(reveal)
+    display_board(setup_counts(mines, width, height))
     return
 
 
-def update_board(move, board, mines, width, height):
-    """Updates the board after a move (after having already checked that we
-    did not hit a mine). If there are any adjacent mines we display their count
-    and are done. Otherwise, we run recursively in all directions until we
-    encounter adjacent mines."""
-    x = move[0]
-    y = move[1]
+class _MineCounts:
+    """Stands in for the counts from setup_counts, as counts[y][x], for
+    update_board without counts; only the locations looked at are counted,
+    from a set of the mines, instead of setting up counts for the whole board."""
 
-    board[y][x] = count_adjacent_mines(move, mines, width, height)
-    if board[y][x] > 0:
-        return
-
-    # board values of <0 mean they have not been cleared yet
-    # Note tests have to run from left to right, otherwise
-    # we will be testing board values with coordinates that are
-    # out of bounds.
-    if x - 1 >= 0 and board[y][x - 1] < 0:
-        update_board((x - 1, y), board, mines, width, height)
-    if x + 1 < width and board[y][x + 1] < 0:
-        update_board((x + 1, y), board, mines, width, height)
-    if y - 1 >= 0 and board[y - 1][x] < 0:
-        update_board((x, y - 1), board, mines, width, height)
-    if y + 1 < height and board[y + 1][x] < 0:
-        update_board((x, y + 1), board, mines, width, height)
-
-    # Not entirely sure if next statements are needed and appropriate
-    if x - 1 >= 0 and y - 1 >= 0 and board[y - 1][x - 1] < 0:
-        update_board((x - 1, y - 1), board, mines, width, height)
-    if x - 1 >= 0 and y + 1 < height and board[y + 1][x - 1] < 0:
-        update_board((x - 1, y + 1), board, mines, width, height)
-    if x + 1 < width and y - 1 >= 0 and board[y - 1][x + 1] < 0:
-        update_board((x + 1, y - 1), board, mines, width, height)
-    if x + 1 < width and y + 1 < height and board[y + 1][x + 1] < 0:
-        update_board((x + 1, y + 1), board, mines, width, height)
+    def __init__(self, mines, width, height, topology=None):
+        self.mines = set(mines)
+        self.width = width
+        self.height = height
+        self.topology = topology
 
-    return
+    def __getitem__(self, y):
+        return _MineCountsRow(self, y)
 
+    def count(self, x, y):
+        if (x, y) in self.mines:
+            return MINE
+        if self.topology is not None:
+            return sum(location in self.mines
+                       for location in neighbours(self.topology, x, y, self.width, self.height))
+        return sum((ix, iy) in self.mines
+                   for iy in range(max(0, y - 1), min(self.height, y + 2))
+                   for ix in range(max(0, x - 1), min(self.width, x + 2)))
 
-def play_game(width, height, number_of_mines):
-    """Plays a single game for a given width, height, and number of mines."""
-    mines = setup_mines(width, height, number_of_mines)
-    board = setup_board(width, height)
-    display_board(board)
-    while True:
-        move = get_move()
 
-        if move in mines:
-            print('You hit a mine. Game over.')
-            return
+class _MineCountsRow:
+    """A row of _MineCounts."""
+
+    def __init__(self, counts, y):
+        self.counts = counts
+        self.y = y
 
-        update_board(move, board, mines, width, height)
-        display_board(board)
+    def __getitem__(self, x):
+        return self.counts.count(x, self.y)
+
+
+def update_board(move, board, mines, width, height, counts=None, stats=None, regions=None,
+                 topology=None, table=None):
+    """Updates the board after a move (after having already checked that we
+    did not hit a mine). If there are any adjacent mines we display their count
+    and are done. Otherwise, we keep clearing in all directions until we
+    encounter adjacent mines. Flagged locations are never cleared.
+    move can also be a list of moves, which are all cleared in a single pass.
+    If Regions for the counts are passed in, a move on a zero clears its whole
+    area from there, without checking any neighbours; unless the area has a
+    flag in it, which may block part of the area.
+    If a count grid from setup_counts is passed in, counts are looked up from
+    that; otherwise only the locations that are cleared get counted, from the
+    mines.
+    If a stats dict is passed in, the number of locations cleared, the number of
+    neighbours checked and the largest size of the stack are added to it.
+    With a topology (see topology.py) the neighbours come from its table,
+    otherwise the board is the usual rectangle. Pass in the table from
+    neighbour_table if it is at hand; otherwise it is only looked up when a
+    zero is cleared.
+    Returns a list with the (x, y) coordinates of all newly cleared locations."""
+    if counts is None:
+        counts = _MineCounts(mines, width, height, topology)
+
+    # This used to recurse for every cleared zero, which ran into the recursion
+    # limit on large empty areas. Now we keep our own stack of locations still
+    # to clear. A location is cleared as soon as it is put on the stack, so
+    # every location is visited at most once.
+    if isinstance(move, tuple):
+        move = [move]
+    revealed = []
+    stack = []
+    for x, y in move:
+        if board[y][x] != -1:
+            continue
+        if regions is not None and counts[y][x] == 0:
+            label = regions.labels[y * width + x]
+            area = regions.locations[regions.offsets[label]:regions.offsets[label + 1]]
+            if not any(board[i // width][i % width] == FLAG for i in area):
+                for i in area:
+                    iy, ix = divmod(i, width)
+                    if board[iy][ix] == -1:
+                        board[iy][ix] = counts[iy][ix]
+                        revealed.append((ix, iy))
+                continue
+        board[y][x] = counts[y][x]
+        revealed.append((x, y))
+        # Only zeros need to be expanded further
+        if board[y][x] == 0:
+            stack.append((x, y))
+    track = stats is not None
+    largest_stack = len(stack)
+    checked = 0
+    if topology is not None:
+        if stack:
+            starts, table = table or neighbour_table(topology, width, height)
+        while stack:
+            if track:
+                largest_stack = max(largest_stack, len(stack))
+            x, y = stack.pop()
+            i = y * width + x
+            if track:
+                checked += starts[i + 1] - starts[i]
+            for neighbour in table[starts[i]:starts[i + 1]]:
+                iy, ix = divmod(neighbour, width)
+                board_row = board[iy]
+                if board_row[ix] == -1:
+                    board_row[ix] = counts[iy][ix]
+                    revealed.append((ix, iy))
+                    if board_row[ix] == 0:
+                        stack.append((ix, iy))
+    else:
+        while stack:
+            if track:
+                largest_stack = max(largest_stack, len(stack))
+            x, y = stack.pop()
+            if track:
+                checked += ((min(width, x + 2) - max(0, x - 1)) *
+                            (min(height, y + 2) - max(0, y - 1)))
+            for iy in range(max(0, y - 1), min(height, y + 2)):
+                board_row = board[iy]
+                counts_row = counts[iy]
+                for ix in range(max(0, x - 1), min(width, x + 2)):
+                    # board values of -1 mean they have not been cleared yet
+                    # (and -2 that they are flagged, which we leave alone)
+                    if board_row[ix] == -1:
+                        board_row[ix] = counts_row[ix]
+                        revealed.append((ix, iy))
+                        if board_row[ix] == 0:
+                            stack.append((ix, iy))
+
+    if track:
+        stats['revealed'] = stats.get('revealed', 0) + len(revealed)
+        stats['neighbours_checked'] = stats.get('neighbours_checked', 0) + checked
+        stats['largest_stack'] = max(stats.get('largest_stack', 0), largest_stack)
+    return revealed
+
+
+class Game:
+    """A single game, without any input or output, so it can be played by
+    other code at full speed. play_game uses this for the interactive game."""
+
+    __slots__ = ('width', 'height', 'number_of_mines', 'seed', 'topology', 'table', 'mines',
+                 'counts', '_regions', 'board', 'covered', 'moves', 'last_revealed', 'result')
+
+    def __init__(self, width, height, number_of_mines, seed=None, mines=None, topology=None,
+                 regions=True):
+        """Start a new game. Mines are set up from the seed, so the same seed
+        gives the same game; unless the mines are passed in directly.
+        topology is one of topology.TOPOLOGIES, or None for the usual rectangle.
+        Without regions, the Regions are not set up with the board, which saves
+        that time for games that don't need a fast first move; moves on a zero
+        then search for the area to clear."""
+        self.width = width
+        self.height = height
+        self.number_of_mines = number_of_mines
+        self.seed = seed
+        self.topology = topology
+        # Neighbour table of the topology, kept with the game so that moves
+        # never have to wait for it to be set up again
+        self.table = None if topology is None else neighbour_table(topology, width, height)
+        if mines is None:
+            mines = setup_mines(width, height, number_of_mines, Random(seed))
+        self.mines = mines
+        self.counts = setup_counts(mines, width, height, topology, self.table)
+        # Areas cleared by a move on a zero, looked up instead of searched for;
+        # set up here, so moves never have to wait for it
+        self._regions = (Regions(self.counts, width, height, topology, self.table)
+                         if regions else None)
+        self.board = setup_board(width, height)
+        # Number of locations still covered, so we don't have to count them
+        # on the board after every move.
+        self.covered = width * height
+        self.moves = 0
+        # Locations cleared by the last move, for players that keep track
+        self.last_revealed = []
+        # None while the game is still going, otherwise 'won' or 'lost'
+        self.result = None
+
+    def move(self, move, stats=None):
+        """Apply a move with x and y coordinates for computer (i.e. starting from 0).
+        Returns list with the coordinates of all locations cleared by the move;
+        which is empty if the move hit a mine, is on a flagged location, or the
+        game was already over. stats is passed on to update_board."""
+        return self.play([('reveal', move)], stats)
+
+    def _check(self, location):
+        x, y = location
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError('Move ' + str(location) + ' is outside the board')
+
+    def flag(self, location):
+        """Flag a covered location as a mine, or unflag it if it was flagged.
+        Flagged locations are not cleared by moves. Returns True if the
+        location changed."""
+        self._check(location)
+        x, y = location
+        if self.result is not None or self.board[y][x] >= 0:
+            return False
+        self.board[y][x] = -1 if self.board[y][x] == FLAG else FLAG
+        return True
+
+    def chord_locations(self, location):
+        """The covered, unflagged neighbours of a cleared number, if that number
+        of its neighbours is flagged; otherwise none."""
+        x, y = location
+        count = self.board[y][x]
+        if count <= 0:
+            return []
+        if self.topology is None:
+            adjacent = [(ix, iy)
+                        for iy in range(max(0, y - 1), min(self.height, y + 2))
+                        for ix in range(max(0, x - 1), min(self.width, x + 2))]
+        else:
+            adjacent = neighbours(self.topology, x, y, self.width, self.height)
+        covered = []
+        flags = 0
+        for ix, iy in adjacent:
+            if self.board[iy][ix] == FLAG:
+                flags += 1
+            elif self.board[iy][ix] == -1:
+                covered.append((ix, iy))
+        return covered if flags == count else []
+
+    def play(self, moves, stats=None):
+        """Apply a batch of moves, as (kind, (x, y)) from parse_moves, where kind
+        is 'reveal', 'flag' or 'chord' (reveal the neighbours of a number whose
+        mines have all been flagged). Flags are set straight away, in order; all
+        locations to reveal are collected, and then cleared in a single pass of
+        update_board. Nothing is applied if any location is outside the board.
+        Returns list with the coordinates of all locations that changed, which
+        includes the flagged ones; also last_revealed is set to the cleared ones.
+        stats is passed on to update_board."""
+        for _, location in moves:
+            self._check(location)
+        self.last_revealed = []
+        if self.result is not None:
+            return []
+
+        flagged = []
+        to_reveal = []
+        for kind, location in moves:
+            if kind == 'flag':
+                if self.flag(location):
+                    flagged.append(location)
+                continue
+            self.moves += 1
+            if kind == 'chord':
+                to_reveal.extend(self.chord_locations(location))
+            elif self.board[location[1]][location[0]] != FLAG:
+                to_reveal.append(location)
+
+        for x, y in to_reveal:
+            if self.counts[y][x] == MINE:
+                self.result = 'lost'
+                return flagged
+
+        revealed = update_board(to_reveal, self.board, self.mines, self.width, self.height,
+                                self.counts, stats, self._regions, self.topology, self.table)
+        self.last_revealed = revealed
+        self.covered -= len(revealed)
+        if self.covered == self.number_of_mines:
+            self.result = 'won'
+        return flagged + revealed if flagged else revealed
+
+    @property
+    def over(self):
+        """True once the game has been won or lost."""
+        return self.result is not None
+
+    @property
+    def regions(self):
+        """Regions of the board; for a game without them, set up when first asked
+        for (which moves don't do)."""
+        if self._regions is None:
+            self._regions = Regions(self.counts, self.width, self.height, self.topology,
+                                    self.table)
+        return self._regions
+
+    @property
+    def three_bv(self):
+        """Smallest number of moves needed to clear the board; see Regions."""
+        return self.regions.three_bv
+
+
+def play_game(width, height, number_of_mines, full_redraw=False, pool=None, metrics=None,
+              log_path=None, topology=None):
+    """Plays a single game for a given width, height, and number of mines.
+    With a pool (from boardpool.py) the board is taken from there, and the game
+    starts with its start location already cleared.
+    Every entry can have a batch of moves, including flags and chords (see
+    parse_moves), which is applied in one go; after which only the changed
+    locations are redrawn, unless full_redraw is set. Boards that don't fit on
+    the screen are shown in a viewport, which scrolls by half a screen at a
+    time, and follows moves outside it.
+    With metrics (a GameMetrics from metrics.py) every batch is measured, and a
+    summary is printed at the end of the game.
+    With a log_path, the game and all its moves are appended to that file (see
+    movelog.py), so it can be replayed later.
+    topology is passed on to Game, to play on another shape of board."""
+    start = None
+    if pool is None:
+        # A game needs a seed to replay it from a log
+        seed = Random().getrandbits(63) if log_path else None
+        game = Game(width, height, number_of_mines, seed=seed, topology=topology)
+    else:
+        mines, start = pool.get(width, height, number_of_mines)
+        game = Game(width, height, number_of_mines, mines=mines, topology=topology)
+    log = None
+    if log_path:
+        # Imported here, as movelog.py imports this module
+        from movelog import MoveLog
+        log = MoveLog(log_path, game)
+    if start is not None:
+        if log is not None:
+            log.record(start)
+        game.move(start)
+    viewport = Viewport.for_terminal(width, height)
+    display_board(game.board, viewport=viewport, topology=topology)
+    while True:
+        try:
+            moves = get_moves()
+        except ValueError:
+            # Redraw the whole board first, in case the entry made the terminal scroll
+            display_board(game.board, viewport=viewport, topology=topology)
+            print('Those are not valid moves. Please try again.')
+            continue
+
+        if isinstance(moves, str):
+            dx, dy = SCROLL_KEYS[moves]
+            viewport.scroll(dx * (viewport.columns // 2), dy * (viewport.rows // 2))
+            display_board(game.board, viewport=viewport, topology=topology)
+            continue
+
+        if metrics is not None:
+            metrics.start_move()
+        try:
+            changed = game.play(moves, None if metrics is None else metrics.stats)
+        except ValueError:
+            display_board(game.board, viewport=viewport, topology=topology)
+            print('That location is not on the board. Please try again.')
+            continue
+        if log is not None:
+            log.record_moves(moves)
+
+        # The whole batch is displayed once, following its last move
+        if game.result != 'lost':
+            if metrics is not None:
+                metrics.start_render()
+            if viewport.follow(moves[-1][1]) or full_redraw:
+                display_board(game.board, viewport=viewport, topology=topology)
+            else:
+                display_board(game.board, changed, viewport, topology)
+        if metrics is not None:
+            metrics.end_move()
 
-        if sum(row.count(-1) for row in board) == number_of_mines:
-            print('Congratulations, you have found all the mines. Game over.')
+        if game.over:
+            if game.result == 'lost':
+                print('You hit a mine. Game over.')
+            else:
+                print('Congratulations, you have found all the mines. Game over.')
+            if metrics is not None:
+                print(metrics.format_summary())
+            if log is not None:
+                log.finish(game)
             return
 
 
-def main():
-    width, height, number_of_mines = get_game_parameters()
-    play_game(width, height, number_of_mines)
+# How much of the board play_script displays
+RENDER_MODES = ('none', 'final', 'every')
+
+
+def play_script(game, lines, render='none', output=None, three_bv=False):
+    """Play a game from lines with moves, as entered in play_game (see
+    parse_moves), without any prompts; until the game is over, a line with q,
+    or the end of the lines. Lines that are not valid moves are skipped.
+    With render 'every' the board is written to output (standard output by
+    default) after every line, with 'final' only once at the end; never with
+    clearing the screen. Returns a result record for the game; with three_bv,
+    including the smallest number of moves needed (see Regions), which means
+    setting up the regions if the game doesn't have them yet."""
+    output = output or sys.stdout
+    errors = 0
+    start = time.perf_counter()
+    for line in lines:
+        if game.over:
+            break
+        if line.strip().lower() == 'q':
+            break
+        if not line.strip():
+            continue
+        try:
+            game.play(parse_moves(line))
+        except ValueError:
+            errors += 1
+            continue
+        if render == 'every':
+            output.write(format_board(game.board, topology=game.topology) + '\n')
+    seconds = time.perf_counter() - start
+    if render != 'none':
+        output.write(format_board(game.board, topology=game.topology) + '\n')
+    record = {'width': game.width, 'height': game.height, 'mines': game.number_of_mines,
+              'seed': game.seed, 'topology': game.topology or 'rectangular',
+              'result': game.result or 'playing', 'moves': game.moves, 'covered': game.covered,
+              'errors': errors, 'seconds': round(seconds, 6)}
+    if three_bv:
+        record['three_bv'] = game.three_bv
+    return record
+
+
+def main(argv=None):
+    """Without any arguments, ask for the size of the board and play a game
+    interactively. With arguments, play a single game from a stream of moves
+    without any prompts, and write a result record for it as a line of JSON."""
+    parser = argparse.ArgumentParser(
+        description='Minesweeper. Without arguments the game is played interactively.')
+    parser.add_argument('--width', type=int)
+    parser.add_argument('--height', type=int)
+    parser.add_argument('--mines', type=int)
+    parser.add_argument('--seed', type=int,
+                        help='seed for the mines; a random one if not given')
+    parser.add_argument('--topology', choices=TOPOLOGIES)
+    parser.add_argument('--moves', default='-',
+                        help="file with a line of moves per turn, or - (default) for "
+                             "standard input")
+    parser.add_argument('--render', choices=RENDER_MODES, default='none',
+                        help='when to write the board: never (default), at the end, '
+                             'or after every line of moves')
+    parser.add_argument('--three-bv', action='store_true',
+                        help='include the smallest number of moves needed (3BV) in the '
+                             'result; this sets up an index of the board first')
+    args = parser.parse_args(argv)
+
+    if args.width is None and args.height is None and args.mines is None:
+        if args.seed is None and args.topology is None and args.moves == '-':
+            width, height, number_of_mines = get_game_parameters()
+            play_game(width, height, number_of_mines)
+            return 0
+        parser.error('--width, --height and --mines are needed to play from a stream of moves')
+    if args.width is None or args.height is None or args.mines is None:
+        parser.error('--width, --height and --mines are all needed')
+    if args.width < 1 or args.height < 1:
+        parser.error('--width and --height need to be at least 1')
+    if not 1 <= args.mines < args.width * args.height:
+        parser.error('--mines needs to be between 1 and {0}'.format(args.width * args.height - 1))
+
+    # Open the moves before setting up the game, which takes a while on large boards
+    try:
+        moves = sys.stdin if args.moves == '-' else open(args.moves)
+    except OSError as error:
+        parser.error("can't open --moves file: {0}".format(error))
+
+    seed = Random().getrandbits(63) if args.seed is None else args.seed
+    # The regions are only worth setting up for the 3BV; a scripted game
+    # doesn't wait for moves
+    game = Game(args.width, args.height, args.mines, seed=seed, topology=args.topology,
+                regions=args.three_bv)
+    try:
+        record = play_script(game, moves, args.render, three_bv=args.three_bv)
+    finally:
+        if moves is not sys.stdin:
+            moves.close()
+    sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Append-only log of the moves in a game, and replaying logged games at full
+speed without any display.
+
+A log is a text file with one line per entry:
+- 'minesweep-log 1 width height number_of_mines' to start, followed by the
+  topology if the game has one (see topology.py)
+- 'seed N' with the seed of the game, or 'mines x y x y ...' if it had none
+- 'x y' for every move, with x and y coordinates for computer; or for a
+  batch of moves that was played in one go, all their coordinates on one line,
+  with f and c before flags and chords as in minesweep.parse_moves
+- 'result won|lost covered' once the game is over
+Logs are only ever appended to, so a single file can hold many games.
+"""
+import argparse
+import sys
+
+from minesweep import Game, MOVE_KINDS, parse_moves
+
+HEADER = 'minesweep-log 1'
+
+
+class MoveLog:
+    """Writes the moves of a game to a log file as they are made. Every line is
+    flushed right away, so the log is complete up to the last move even if the
+    program is stopped."""
+
+    def __init__(self, path, game):
+        self.file = open(path, 'a', buffering=1)
+        self.file.write('{0} {1} {2} {3}{4}\n'.format(
+            HEADER, game.width, game.height, game.number_of_mines,
+            '' if game.topology is None else ' ' + game.topology))
+        if isinstance(game.seed, int):
+            self.file.write('seed {0}\n'.format(game.seed))
+        else:
+            self.file.write('mines ' + ' '.join('{0} {1}'.format(x, y) for x, y in game.mines) + '\n')
+
+    def record(self, move):
+        self.file.write('{0} {1}\n'.format(move[0], move[1]))
+
+    def record_moves(self, moves):
+        """Record a batch of moves, as from minesweep.parse_moves."""
+        words = []
+        kind = 'reveal'
+        for move_kind, (x, y) in moves:
+            if move_kind != kind:
+                kind = move_kind
+                words.append(kind[0])
+            words.append('{0} {1}'.format(x, y))
+        self.file.write(' '.join(words) + '\n')
+
+    def finish(self, game):
+        """Record the result of a finished game, and close the log."""
+        self.file.write('result {0} {1}\n'.format(game.result, game.covered))
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+
+def _read_game(lines):
+    """Set up a game from the first two lines of a log."""
+    header = lines[0].split()
+    if ' '.join(header[:2]) != HEADER:
+        raise ValueError('Not a move log: ' + lines[0].strip())
+    width, height, number_of_mines = (int(value) for value in header[2:5])
+    topology = header[5] if len(header) > 5 else None
+    kind, _, values = lines[1].partition(' ')
+    if kind == 'seed':
+        return Game(width, height, number_of_mines, seed=int(values), topology=topology)
+    values = [int(value) for value in values.split()]
+    return Game(width, height, number_of_mines, mines=list(zip(values[::2], values[1::2])),
+                topology=topology)
+
+
+def replay(lines):
+    """Replay the lines of a log. Returns the game after the last move, and the
+    recorded result as (result, covered), or None if the log has no result."""
+    game = _read_game(lines)
+    recorded = None
+    move = game.move
+    for line in lines[2:]:
+        if line.startswith('result'):
+            _, result, covered = line.split()
+            recorded = (result, int(covered))
+            break
+        words = line.split()
+        if len(words) == 2:
+            move((int(words[0]), int(words[1])))
+        else:
+            # A batch of moves; parse_moves wants human counting form
+            game.play(parse_moves(' '.join(word if word in MOVE_KINDS else str(int(word) + 1)
+                                           for word in words)))
+    return game, recorded
+
+
+def split_games(lines):
+    """Split the lines of a log file (or any iterable of lines) into the lines
+    per game, without reading more than one game at a time."""
+    game_lines = []
+    for line in lines:
+        if line.startswith(HEADER) and game_lines:
+            yield game_lines
+            game_lines = []
+        game_lines.append(line)
+    if game_lines:
+        yield game_lines
+
+
+def replay_file(path):
+    """Replay all games in a log file, and return a list with the results of
+    replay for each game."""
+    with open(path) as file:
+        return [replay(lines) for lines in split_games(file)]
+
+
+def verify_logs(paths):
+    """Replay all games in many log files in one pass, and yield for each game
+    the path, whether the replay ended with the recorded result, and the
+    replayed game. Games without a result are considered correct if the game
+    is still going."""
+    for path in paths:
+        with open(path) as file:
+            for lines in split_games(file):
+                game, recorded = replay(lines)
+                if recorded is None:
+                    correct = not game.over
+                else:
+                    correct = (game.result, game.covered) == recorded
+                yield path, correct, game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay move logs and check their results.')
+    parser.add_argument('logs', nargs='+')
+    args = parser.parse_args(argv)
+
+    games = 0
+    failed = 0
+    for path, correct, game in verify_logs(args.logs):
+        games += 1
+        if not correct:
+            failed += 1
+            print('MISMATCH: game in {0} replayed to {1} with {2} covered'.format(
+                path, game.result, game.covered))
+    print('{0} games replayed, {1} mismatches.'.format(games, failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Optional NumPy version of the board and minefield functions in minesweep.py.
+
+The board is an int8 array with y as first sub-script and x as second
+subscript, just like the lists in minesweep.py, and uses the same values:
+negative for locations not yet cleared, otherwise the number of adjacent mines.
+Mines are a boolean mask of the same shape. Everything is done with whole-array
+operations, so boards with tens of millions of locations don't need per-location
+Python loops. The list-of-lists functions in minesweep.py remain the reference
+implementation; this module needs numpy to be installed.
+"""
+import numpy as np
+
+from minesweep import MINE
+
+
+def setup_mines(width, height, number_of_mines, rng=None):
+    """Set up a boolean mask with mines, of shape (height, width).
+    rng can be a numpy Generator, or a seed for one."""
+    rng = np.random.default_rng(rng)
+    mines = np.zeros(width * height, dtype=bool)
+    mines[rng.choice(width * height, number_of_mines, replace=False)] = True
+    return mines.reshape(height, width)
+
+
+def setup_board(width, height):
+    """Set up the initial board, with all locations not yet cleared."""
+    return np.full((height, width), -1, dtype=np.int8)
+
+
+def _neighbourhood_sum(mask):
+    """Sum of each 3x3 neighbourhood (including the centre) of a boolean mask."""
+    height, width = mask.shape
+    padded = np.zeros((height + 2, width + 2), dtype=np.int8)
+    padded[1:-1, 1:-1] = mask
+    total = np.zeros((height, width), dtype=np.int8)
+    for dy in range(3):
+        for dx in range(3):
+            total += padded[dy:dy + height, dx:dx + width]
+    return total
+
+
+def setup_counts(mines):
+    """Set up an int8 array with the number of adjacent mines for every location,
+    and mines indicated as 9's (MINE)."""
+    counts = _neighbourhood_sum(mines)
+    counts[mines] = MINE
+    return counts
+
+
+def reveal_board(mines):
+    """Cheat function that returns the fully revealed board, with mines as 9's.
+    Unlike minesweep.reveal_board this doesn't display anything, because the
+    boards this is meant for are far too large to print."""
+    return setup_counts(mines)
+
+
+def setup_labels(counts):
+    """Label the connected (including diagonally) areas of zeros in the counts.
+    Returns a flat int array; zeros in the same area get the same label, which is
+    the flat index of the first location in that area. Labels of other locations
+    are meaningless.
+    Labels are found by repeatedly hooking each area onto the lowest label found
+    next to it, followed by pointer jumping, so the number of whole-array passes
+    grows with the logarithm of the size of an area rather than its length."""
+    height, width = counts.shape
+    zeros = (counts == 0).ravel()
+    labels = np.arange(width * height)
+    zero_index = np.flatnonzero(zeros)
+    no_label = width * height
+    while True:
+        # Lowest label among the zeros in each neighbourhood
+        padded = np.full((height + 2, width + 2), no_label, dtype=labels.dtype)
+        padded[1:-1, 1:-1] = np.where(zeros, labels, no_label).reshape(height, width)
+        lowest = padded[1:-1, 1:-1].copy()
+        for dy in range(3):
+            for dx in range(3):
+                np.minimum(lowest, padded[dy:dy + height, dx:dx + width], out=lowest)
+        lowest = lowest.ravel()[zero_index]
+        changed = lowest < labels[zero_index]
+        if not changed.any():
+            return labels
+        np.minimum.at(labels, labels[zero_index[changed]], lowest[changed])
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def update_board(move, board, counts, labels=None):
+    """Updates the board after a move (after having already checked that we
+    did not hit a mine), in the same way as minesweep.update_board. A move on a
+    zero clears its whole labelled area of zeros plus the counts bordering it.
+    Labels are set up from the counts if they are not passed in, but for
+    repeated moves it's much faster to set them up once with setup_labels.
+    Returns the flat indices of all newly cleared locations."""
+    x, y = move
+    height, width = board.shape
+    if board[y, x] >= 0:
+        return np.empty(0, dtype=np.intp)
+    if counts[y, x] != 0:
+        board[y, x] = counts[y, x]
+        return np.array([y * width + x])
+
+    if labels is None:
+        labels = setup_labels(counts)
+    area = (labels == labels[y * width + x]).reshape(height, width) & (counts == 0)
+    cleared = (_neighbourhood_sum(area) > 0) & (board < 0)
+    board[cleared] = counts[cleared]
+    return np.flatnonzero(cleared)
@@ -0,0 +1,203 @@
+"""
+Save and load games in a compact binary format.
+
+The file starts with a header (see HEADER), followed by four sections, each
+with one entry per location in the order y * width + x:
+- mines: 1 bit per location, lowest bit first
+- cleared: 1 bit per location, lowest bit first
+- flagged: 1 bit per location, lowest bit first
+- counts: 4 bits per location, low half of a byte first; 9 (MINE) for mines
+Large saved boards can be opened memory-mapped with MappedBoard, to look at
+and play them without reading everything into lists first.
+"""
+import mmap
+import struct
+
+from minesweep import Game, FLAG, MINE
+
+MAGIC = b'MSWP'
+# Version 2 added the flagged section, and the result in the header
+VERSION = 2
+# magic, version, has seed, result, (padding), width, height, number of mines, seed
+HEADER = struct.Struct('<4sBBBxIIIq')
+# Results of a game (Game.result) as kept in the header, and where
+RESULTS = (None, 'won', 'lost')
+RESULT_OFFSET = struct.calcsize('<4sBB')
+
+
+def _sections(width, height):
+    """Offsets of the mines, cleared, flagged and counts sections, and the file size."""
+    area = width * height
+    mines = HEADER.size
+    cleared = mines + (area + 7) // 8
+    flagged = cleared + (area + 7) // 8
+    counts = flagged + (area + 7) // 8
+    return mines, cleared, flagged, counts, counts + (area + 1) // 2
+
+
+def save_game(game, path):
+    """Save a game (a minesweep.Game) to a file. The seed is only kept if it is
+    an integer. Only games on the usual rectangle can be saved."""
+    if game.topology is not None:
+        raise ValueError('Games with a topology can not be saved')
+    width = game.width
+    height = game.height
+    has_seed = isinstance(game.seed, int)
+    mines_offset, cleared_offset, flagged_offset, counts_offset, size = _sections(width, height)
+    data = bytearray(size)
+    data[:HEADER.size] = HEADER.pack(MAGIC, VERSION, has_seed, RESULTS.index(game.result),
+                                     width, height, game.number_of_mines,
+                                     game.seed if has_seed else 0)
+    for x, y in game.mines:
+        i = y * width + x
+        data[mines_offset + (i >> 3)] |= 1 << (i & 7)
+    i = 0
+    for y in range(height):
+        board_row = game.board[y]
+        counts_row = game.counts[y]
+        for x in range(width):
+            if board_row[x] >= 0:
+                data[cleared_offset + (i >> 3)] |= 1 << (i & 7)
+            elif board_row[x] == FLAG:
+                data[flagged_offset + (i >> 3)] |= 1 << (i & 7)
+            data[counts_offset + (i >> 1)] |= counts_row[x] << ((i & 1) * 4)
+            i += 1
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def _read_header(data):
+    (magic, version, has_seed, result,
+     width, height, number_of_mines, seed) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or result >= len(RESULTS):
+        raise ValueError('Not a saved minesweeper game, or an unknown version')
+    return width, height, number_of_mines, seed if has_seed else None, RESULTS[result]
+
+
+def load_game(path):
+    """Load a saved game into a minesweep.Game."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    width, height, number_of_mines, seed, result = _read_header(data)
+    mines_offset, cleared_offset, flagged_offset, _, _ = _sections(width, height)
+    mines = [(i % width, i // width) for i in range(width * height)
+             if data[mines_offset + (i >> 3)] >> (i & 7) & 1]
+    game = Game(width, height, number_of_mines, seed=seed, mines=mines)
+    i = 0
+    for y in range(height):
+        board_row = game.board[y]
+        counts_row = game.counts[y]
+        for x in range(width):
+            if data[cleared_offset + (i >> 3)] >> (i & 7) & 1:
+                board_row[x] = counts_row[x]
+                game.covered -= 1
+            elif data[flagged_offset + (i >> 3)] >> (i & 7) & 1:
+                board_row[x] = FLAG
+            i += 1
+    game.result = result
+    return game
+
+
+class MappedBoard:
+    """A saved game opened memory-mapped, so only the parts that are used get
+    read from the file. With writable set, moves are written straight back to
+    the file, as is the result once a move hits a mine or clears the board.
+    Use as a context manager, or call close() when done."""
+
+    def __init__(self, path, writable=False):
+        self.file = open(path, 'r+b' if writable else 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0,
+                              access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        (self.width, self.height, self.number_of_mines, self.seed,
+         self.result) = _read_header(self.data)
+        (self.mines_offset, self.cleared_offset, self.flagged_offset,
+         self.counts_offset, _) = _sections(self.width, self.height)
+        cleared = self.data[self.cleared_offset:self.flagged_offset]
+        self.covered = self.width * self.height - int.from_bytes(cleared, 'little').bit_count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def _index(self, location):
+        """Index y * width + x of a location; a location outside the board
+        would end up on another row, or in another section of the file."""
+        x, y = location
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError('Move ' + str(location) + ' is outside the board')
+        return y * self.width + x
+
+    def is_mine(self, location):
+        i = self._index(location)
+        return self.data[self.mines_offset + (i >> 3)] >> (i & 7) & 1 == 1
+
+    def is_cleared(self, location):
+        i = self._index(location)
+        return self.data[self.cleared_offset + (i >> 3)] >> (i & 7) & 1 == 1
+
+    def is_flagged(self, location):
+        i = self._index(location)
+        return self.data[self.flagged_offset + (i >> 3)] >> (i & 7) & 1 == 1
+
+    def count(self, location):
+        """Number of adjacent mines; or 9 (MINE) for a mine."""
+        i = self._index(location)
+        return self.data[self.counts_offset + (i >> 1)] >> ((i & 1) * 4) & 15
+
+    def value(self, location):
+        """Value on the board: -1 if not cleared yet, FLAG (-2) if flagged,
+        otherwise the count."""
+        if self.is_cleared(location):
+            return self.count(location)
+        return FLAG if self.is_flagged(location) else -1
+
+    def window(self, left, bottom, columns, rows):
+        """Part of the board as list of lists, as from setup_board, with
+        left, bottom as location 0, 0; for display_board."""
+        return [[self.value((x, y)) for x in range(left, left + columns)]
+                for y in range(bottom, bottom + rows)]
+
+    def _clear(self, location):
+        i = self._index(location)
+        self.data[self.cleared_offset + (i >> 3)] |= 1 << (i & 7)
+
+    def _set_result(self, result):
+        self.result = result
+        self.data[RESULT_OFFSET] = RESULTS.index(result)
+
+    def move(self, move):
+        """Apply a move in the same way as minesweep.Game.move, writing the cleared
+        locations to the file. Returns list with the coordinates of all locations
+        cleared; none if the move hit a mine. Flagged locations are left alone,
+        and once the game is over nothing changes any more. Raises ValueError
+        for a move outside the board, before anything is written."""
+        self._index(move)
+        if self.result is not None or self.is_cleared(move) or self.is_flagged(move):
+            return []
+        if self.count(move) == MINE:
+            self._set_result('lost')
+            return []
+        width = self.width
+        height = self.height
+        self._clear(move)
+        revealed = [move]
+        stack = [move] if self.count(move) == 0 else []
+        while stack:
+            x, y = stack.pop()
+            for iy in range(max(0, y - 1), min(height, y + 2)):
+                for ix in range(max(0, x - 1), min(width, x + 2)):
+                    if not self.is_cleared((ix, iy)) and not self.is_flagged((ix, iy)):
+                        self._clear((ix, iy))
+                        revealed.append((ix, iy))
+                        if self.count((ix, iy)) == 0:
+                            stack.append((ix, iy))
+        self.covered -= len(revealed)
+        if self.covered == self.number_of_mines:
+            self._set_result('won')
+        return revealed
@@ -0,0 +1,159 @@
+"""
+Server for playing many games at the same time over TCP, one game per
+connection, with a simple line based protocol:
+- 'new width height mines' starts a new game; optionally followed by a
+  topology (rectangular, toroidal or hexagonal, see topology.py)
+- 'x y' makes a move, with coordinates in human counting form as in get_move;
+  or a batch of moves on one line, with flags and chords, as in parse_moves
+- 'board' shows the board again, or 'board x y' the part of it with x y at
+  the lower left; at most VIEW_COLUMNS by VIEW_ROWS locations at a time
+- 'q' ends the connection
+After 'new' and 'board' the reply is the board (as from display_board,
+without clearing the screen); after moves it is a line 'changed' followed by
+x y and the new value (as displayed) of every location that changed. Either
+can be followed by a message, and then comes a status line:
+'status playing|won|lost|none'.
+Nothing blocks on input, so a waiting connection only costs its board; and
+setting up games and making moves is done in worker threads, so large boards
+don't hold up the other connections.
+"""
+import argparse
+import asyncio
+
+from minesweep import Game, Viewport, _cell_text, format_board, parse_moves
+from topology import TOPOLOGIES
+
+MIN_SIZE = 3
+MAX_SIZE = 1000
+# Largest part of the board sent at once
+VIEW_COLUMNS = 80
+VIEW_ROWS = 40
+
+
+def _new_game(arguments):
+    """Start a game from the arguments of a 'new' command."""
+    topology = None
+    if len(arguments) == 4:
+        topology = arguments.pop().lower()
+        if topology not in TOPOLOGIES:
+            raise ValueError('topology needs to be one of ' + ', '.join(TOPOLOGIES))
+    width, height, number_of_mines = (int(value) for value in arguments)
+    if not (MIN_SIZE <= width <= MAX_SIZE and MIN_SIZE <= height <= MAX_SIZE):
+        raise ValueError('width and height need to be between {0} and {1}'.format(
+            MIN_SIZE, MAX_SIZE))
+    if not 1 <= number_of_mines < width * height:
+        raise ValueError('number of mines needs to be between 1 and {0}'.format(
+            width * height - 1))
+    return Game(width, height, number_of_mines, topology=topology)
+
+
+def _board(game, arguments=()):
+    """The board of a game, as far as it fits in the view; starting from the
+    location in the arguments of a 'board' command, if any."""
+    viewport = Viewport(game.width, game.height, VIEW_COLUMNS, VIEW_ROWS)
+    if arguments:
+        x, y = (int(value) - 1 for value in arguments)
+        viewport.scroll(x, y)
+    return format_board(game.board, viewport, game.topology)
+
+
+def _changes(game, changed):
+    """Line with x y (in human counting form) and the value of every changed location."""
+    board = game.board
+    return ' '.join(['changed'] + ['{0} {1} {2}'.format(x + 1, y + 1, _cell_text(board[y][x]))
+                                   for x, y in changed])
+
+
+def handle_command(game, line):
+    """Handle a single line of input for a session. Returns the game (which
+    may be a new one, or None if there is none yet), the lines to reply, and
+    whether the session should end."""
+    game, reply = _handle_command(game, line)
+    if reply is None:
+        return game, ['Thanks for playing.'], True
+    return game, reply + [_status(game)], False
+
+
+def _handle_command(game, line):
+    """Handle a single line of input; returns the game and the lines to reply,
+    or None for those to end the session."""
+    words = line.split()
+    if not words:
+        return game, []
+    command = words[0].lower()
+    if command == 'q':
+        return game, None
+    try:
+        if command == 'new':
+            game = _new_game(words[1:])
+            return game, [_board(game)]
+        if game is None:
+            return game, ["Start a game first, with 'new width height mines'."]
+        if command == 'board':
+            return game, [_board(game, words[1:3])]
+        if game.over:
+            return game, ["This game is over; start a new one with 'new width height mines'."]
+        changed = game.play(parse_moves(line))
+    except (ValueError, IndexError) as error:
+        return game, ['ERROR ' + (str(error) or 'that is not a valid command')]
+
+    reply = [_changes(game, changed)]
+    if game.result == 'lost':
+        reply.append('You hit a mine. Game over.')
+    elif game.result == 'won':
+        reply.append('Congratulations, you have found all the mines. Game over.')
+    return game, reply
+
+
+def _status(game):
+    if game is None:
+        return 'status none'
+    return 'status ' + (game.result or 'playing')
+
+
+async def handle_session(reader, writer):
+    """Play games with a single connection, until it sends 'q' or closes."""
+    game = None
+    loop = asyncio.get_running_loop()
+    writer.write(b"Welcome to minesweeper. Start a game with 'new width height mines'.\n"
+                 b'status none\n')
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            # In a worker thread, so the other connections go on meanwhile
+            game, reply, done = await loop.run_in_executor(
+                None, handle_command, game, line.decode(errors='replace'))
+            writer.write(('\n'.join(reply) + '\n').encode())
+            await writer.drain()
+            if done:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, backlog=1024):
+    """Start the server. Returns the asyncio server, which is already listening.
+    The backlog is large, so thousands of players can connect at once."""
+    return await asyncio.start_server(handle_session, host, port, backlog=backlog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Minesweeper server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = await serve(args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Play minesweeper games without any input or output, using a strategy
+function to choose the moves, and report how fast that goes.
+"""
+import argparse
+from multiprocessing import Pool
+from random import Random
+import time
+
+from minesweep import Game
+
+
+def random_strategy(game, rng):
+    """Strategy that picks a random location which has not been cleared yet.
+    A strategy gets the game and a random.Random, and returns the next move
+    as a tuple with x and y coordinates for computer."""
+    while True:
+        x = rng.randrange(game.width)
+        y = rng.randrange(game.height)
+        if game.board[y][x] < 0:
+            return x, y
+
+
+def play_headless_game(strategy, width, height, number_of_mines, seed=None):
+    """Play a single game with a strategy until it is won or lost.
+    The seed is used for the mines as well as for the strategy.
+    Returns the finished game."""
+    game = Game(width, height, number_of_mines, seed=seed)
+    rng = Random(seed)
+    while not game.over:
+        game.move(strategy(game, rng))
+    return game
+
+
+def run_games(strategy, number_of_games, width, height, number_of_mines, seed=None):
+    """Play a number of games with a strategy, and return a dict with
+    the number of games played and won, the total number of moves, the time
+    it took in seconds and the number of games per second.
+    If a seed is given, game i is played with seed + i, so any game can be
+    played again by itself."""
+    won = 0
+    moves = 0
+    start = time.perf_counter()
+    for i in range(number_of_games):
+        game = play_headless_game(strategy, width, height, number_of_mines,
+                                  None if seed is None else seed + i)
+        won += game.result == 'won'
+        moves += game.moves
+    seconds = time.perf_counter() - start
+    return {
+        'games': number_of_games,
+        'won': won,
+        'moves': moves,
+        'seconds': seconds,
+        'games_per_second': number_of_games / seconds if seconds else float('inf'),
+    }
+
+
+def _play_shard(shard):
+    """Play the games for one shard of a batch, with seeds first_seed up to
+    (but not including) first_seed + number_of_games. Returns partial totals.
+    This runs in a worker process, so it has to be a module level function."""
+    strategy, first_seed, number_of_games, width, height, number_of_mines = shard
+    totals = {'games': 0, 'won': 0, 'moves': 0, 'revealed': 0, 'largest_reveal': 0}
+    for seed in range(first_seed, first_seed + number_of_games):
+        game = Game(width, height, number_of_mines, seed=seed)
+        rng = Random(seed)
+        while not game.over:
+            revealed = len(game.move(strategy(game, rng)))
+            totals['revealed'] += revealed
+            totals['largest_reveal'] = max(totals['largest_reveal'], revealed)
+        totals['games'] += 1
+        totals['won'] += game.result == 'won'
+        totals['moves'] += game.moves
+    return totals
+
+
+def iter_batch(strategy, number_of_games, width, height, number_of_mines,
+               seed=0, processes=None, shard_size=1000):
+    """Play a large number of games spread over a pool of worker processes,
+    and yield the combined totals every time a shard of games is finished.
+    Game i is always played with seed + i, whichever worker plays it, so any
+    game can be played again by itself with play_headless_game.
+    The strategy has to be a module level function, so it can be sent to the
+    worker processes."""
+    shards = [(strategy, seed + first, min(shard_size, number_of_games - first),
+               width, height, number_of_mines)
+              for first in range(0, number_of_games, shard_size)]
+    totals = {'games': 0, 'won': 0, 'moves': 0, 'revealed': 0, 'largest_reveal': 0}
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        for shard_totals in pool.imap_unordered(_play_shard, shards):
+            for key in ('games', 'won', 'moves', 'revealed'):
+                totals[key] += shard_totals[key]
+            totals['largest_reveal'] = max(totals['largest_reveal'], shard_totals['largest_reveal'])
+            totals['seconds'] = time.perf_counter() - start
+            totals['win_rate'] = totals['won'] / totals['games']
+            totals['moves_per_game'] = totals['moves'] / totals['games']
+            totals['reveal_per_move'] = totals['revealed'] / totals['moves']
+            totals['games_per_second'] = totals['games'] / totals['seconds']
+            yield dict(totals)
+
+
+def run_batch(strategy, number_of_games, width, height, number_of_mines,
+              seed=0, processes=None, shard_size=1000):
+    """Play a large number of games over a pool of worker processes (see
+    iter_batch) and return the final totals; all zeros for no games."""
+    totals = {'games': 0, 'won': 0, 'moves': 0, 'revealed': 0, 'largest_reveal': 0,
+              'seconds': 0.0, 'win_rate': 0.0, 'moves_per_game': 0.0, 'reveal_per_move': 0.0,
+              'games_per_second': 0.0}
+    for totals in iter_batch(strategy, number_of_games, width, height, number_of_mines,
+                             seed, processes, shard_size):
+        pass
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--width', type=int, default=9)
+    parser.add_argument('--height', type=int, default=9)
+    parser.add_argument('--mines', type=int, default=10)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--processes', type=int,
+                        help='play games over this many worker processes')
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error('--games needs to be at least 1')
+
+    if args.processes:
+        stats = run_batch(random_strategy, args.games, args.width, args.height, args.mines,
+                          args.seed or 0, args.processes)
+        print('Win rate {win_rate:.3f}, {moves_per_game:.2f} moves per game, '
+              '{reveal_per_move:.2f} locations cleared per move, '
+              'largest clear {largest_reveal}.'.format(**stats))
+    else:
+        stats = run_games(random_strategy, args.games, args.width, args.height, args.mines, args.seed)
+    print('Played {games} games, won {won}, {moves} moves in {seconds:.2f} seconds; '
+          '{games_per_second:.0f} games per second.'.format(**stats))
+
+
+if __name__ == '__main__':
+    main()
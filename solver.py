@@ -0,0 +1,147 @@
+"""
+Automatic player for minesweeper, working from the board as updated by
+update_board. It only uses what a human player can see on the board.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1 << 16)
+def neighbours(x, y, width, height):
+    """List with the coordinates of all locations adjacent to x, y.
+    Remembered for the locations used most recently, so don't change it."""
+    return [(ix, iy)
+            for iy in range(max(0, y - 1), min(height, y + 2))
+            for ix in range(max(0, x - 1), min(width, x + 2))
+            if ix != x or iy != y]
+
+
+class Solver:
+    """Finds locations that must be safe or must be mines, using two rules:
+    - a count with as many unknown neighbours as missing mines has only mines
+      around it, and a count with no missing mines has only safe neighbours;
+    - if the unknown neighbours of one count are a subset of those of another
+      count, the difference holds the difference in missing mines.
+    To keep this fast on large boards the rules are only applied to counts
+    whose neighbourhood changed since the last time; the frontier."""
+
+    def __init__(self, board):
+        """Start solving a board; a list of lists as set up by setup_board,
+        which will be read (but not changed) as the game goes on."""
+        self.board = board
+        self.height = len(board)
+        self.width = len(board[0])
+        # Locations known to be mines, and known to be safe but still covered
+        self.mines = set()
+        self.safe = set()
+        # Counts on the frontier that still need to be looked at
+        self.dirty = set()
+
+    def update(self, revealed):
+        """Tell the solver which locations were cleared by the last move."""
+        for x, y in revealed:
+            self.safe.discard((x, y))
+            self._touch(x, y)
+
+    def _touch(self, x, y):
+        """Mark all cleared counts on and around x, y as changed."""
+        board = self.board
+        for ix, iy in neighbours(x, y, self.width, self.height) + [(x, y)]:
+            if board[iy][ix] > 0:
+                self.dirty.add((ix, iy))
+
+    def _unknown(self, x, y):
+        """Unknown neighbours of the count at x, y, and the number of mines
+        still missing among them."""
+        board = self.board
+        unknown = set()
+        missing = board[y][x]
+        for location in neighbours(x, y, self.width, self.height):
+            if location in self.mines:
+                missing -= 1
+            elif board[location[1]][location[0]] < 0 and location not in self.safe:
+                unknown.add(location)
+        return unknown, missing
+
+    def _conclude(self, locations, mines):
+        """Record locations as all mines, or all safe."""
+        for location in locations:
+            (self.mines if mines else self.safe).add(location)
+            self._touch(*location)
+
+    def _subset_rule(self, x, y, unknown, missing):
+        """Compare the count at x, y with all other counts that can share unknown
+        neighbours with it. Returns True as soon as something was concluded."""
+        board = self.board
+        for iy in range(max(0, y - 2), min(self.height, y + 3)):
+            for ix in range(max(0, x - 2), min(self.width, x + 3)):
+                if board[iy][ix] <= 0 or (ix, iy) == (x, y):
+                    continue
+                other, other_missing = self._unknown(ix, iy)
+                if unknown < other:
+                    difference = other - unknown
+                    difference_missing = other_missing - missing
+                elif other < unknown:
+                    difference = unknown - other
+                    difference_missing = missing - other_missing
+                else:
+                    continue
+                if difference_missing == 0:
+                    self._conclude(difference, mines=False)
+                    return True
+                if difference_missing == len(difference):
+                    self._conclude(difference, mines=True)
+                    return True
+        return False
+
+    def solve(self):
+        """Apply the rules to the frontier until nothing more can be found.
+        Returns sets with the locations known to be safe (and not yet cleared)
+        and the locations known to be mines. These are the solver's own sets,
+        so don't change them."""
+        while self.dirty:
+            x, y = self.dirty.pop()
+            unknown, missing = self._unknown(x, y)
+            if not unknown:
+                continue
+            if missing == 0:
+                self._conclude(unknown, mines=False)
+                continue
+            if missing == len(unknown):
+                self._conclude(unknown, mines=True)
+                continue
+
+            if self._subset_rule(x, y, unknown, missing):
+                # What we know about x, y has changed, so look at it again
+                self.dirty.add((x, y))
+
+        return self.safe, self.mines
+
+
+class SolverStrategy:
+    """Strategy for the game runners in simulation.py: clear a location the
+    solver knows to be safe, or guess a random location that is not a known
+    mine if there is none. A new solver is started for every new game."""
+
+    def __init__(self):
+        self.game = None
+        self.solver = None
+        self.guesses = 0
+
+    def __call__(self, game, rng):
+        if game is not self.game:
+            self.game = game
+            self.solver = Solver(game.board)
+        else:
+            self.solver.update(game.last_revealed)
+
+        safe, mines = self.solver.solve()
+        if safe:
+            # Popping it is fine, because it will be cleared by this move
+            return safe.pop()
+        self.guesses += 1
+        while True:
+            x = rng.randrange(game.width)
+            y = rng.randrange(game.height)
+            if game.board[y][x] < 0 and (x, y) not in mines:
+                return x, y
+
@@ -0,0 +1,58 @@
+"""
+Shapes of the board, which decide which locations are adjacent:
+- rectangular: the usual 8 neighbours, up to the edges of the board
+- toroidal: the usual 8 neighbours, but the edges wrap around to the other side
+- hexagonal: 6 neighbours; every odd row (y = 1, 3, ...) is shifted half a
+  location to the right, so a location is adjacent to 2 locations in the row
+  above and 2 in the row below, besides the ones to its left and right
+For each shape and board size, the neighbours of every location are worked out
+once and kept in a table, so counting and clearing don't need any checks for
+the edges of the board.
+"""
+from array import array
+from functools import lru_cache
+
+TOPOLOGIES = ('rectangular', 'toroidal', 'hexagonal')
+
+
+def neighbours(topology, x, y, width, height):
+    """List with the coordinates of all locations adjacent to x, y; without
+    x, y itself, and without duplicates on very small toroidal boards."""
+    if topology == 'rectangular':
+        return [(ix, iy)
+                for iy in range(max(0, y - 1), min(height, y + 2))
+                for ix in range(max(0, x - 1), min(width, x + 2))
+                if ix != x or iy != y]
+    if topology == 'toroidal':
+        found = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                location = ((x + dx) % width, (y + dy) % height)
+                if location != (x, y) and location not in found:
+                    found.append(location)
+        return found
+    if topology == 'hexagonal':
+        # Odd rows are shifted to the right, so their neighbours above and
+        # below are at x and x + 1; for even rows at x - 1 and x.
+        shift = y % 2
+        candidates = [(x - 1, y), (x + 1, y),
+                      (x - 1 + shift, y - 1), (x + shift, y - 1),
+                      (x - 1 + shift, y + 1), (x + shift, y + 1)]
+        return [(ix, iy) for ix, iy in candidates if 0 <= ix < width and 0 <= iy < height]
+    raise ValueError('Unknown topology: ' + str(topology))
+
+
+@lru_cache(maxsize=2)
+def neighbour_table(topology, width, height):
+    """Table with the neighbours of every location, as two arrays of C integers
+    (4 bytes per entry); returns starts, table. Locations are given by index
+    y * width + x, and the neighbours of location i are
+    table[starts[i]:starts[i + 1]]. Remembered for the last two board sizes,
+    so games of the same size share it."""
+    starts = array('i', [0])
+    table = array('i')
+    for y in range(height):
+        for x in range(width):
+            table.extend(iy * width + ix for ix, iy in neighbours(topology, x, y, width, height))
+            starts.append(len(table))
+    return starts, table
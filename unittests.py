@@ -1,8 +1,33 @@
 """unit tests for minesweep.py"""
 
+import asyncio
+import io
+import json
 import minesweep
+import os
+import random
+import tempfile
+import time
 import unittest
 from unittest import mock
+import analytics
+import benchmarks
+import bitboard
+import boardpool
+import chunked
+import compact
+import hints
+import metrics
+import movelog
+import savefile
+import server
+import simulation
+import solver
+import topology
+try:
+    import numpy_engine
+except ImportError:
+    numpy_engine = None
 #import sys
 #import io
 
@@ -162,6 +187,35 @@ class TestSetupMines(unittest.TestCase):
         self.assertTrue(all(mine[1] < self.height for mine in self.mines))
 
 
+class TestSetupCounts(unittest.TestCase):
+    """test function setup_counts"""
+
+    def setUp(self):
+        self.width = 15
+        self.height = 9
+        self.mines = minesweep.setup_mines(self.width, self.height, 40)
+        self.counts = minesweep.setup_counts(self.mines, self.width, self.height)
+
+    def test_grid_dimensions(self):
+        """check that the count grid has height rows of width values"""
+        self.assertEqual(len(self.counts), self.height)
+        self.assertTrue(all(len(row) == self.width for row in self.counts))
+
+    def test_mines_are_marked(self):
+        """check that every mine is marked with MINE, and nothing else is"""
+        marked = [(x, y) for y in range(self.height) for x in range(self.width)
+                  if self.counts[y][x] == minesweep.MINE]
+        self.assertEqual(sorted(marked), sorted(self.mines))
+
+    def test_counts_match_count_adjacent_mines(self):
+        """check that every count equals the result of count_adjacent_mines"""
+        for y in range(self.height):
+            for x in range(self.width):
+                if (x, y) not in self.mines:
+                    self.assertEqual(self.counts[y][x], minesweep.count_adjacent_mines(
+                        (x, y), self.mines, self.width, self.height))
+
+
 class TestSetupBoard(unittest.TestCase):
     """ test function setup_board"""
 
@@ -198,9 +252,111 @@ class TestSetupBoard(unittest.TestCase):
         self.assertEqual(self.board[0][0], -1)
 
 
-# No unit tests for display_board function.
-# Testing that would require a lot of I/O redirection and testing.
-# More convenient to test by eye on actual output.
+class TestFormatBoard(unittest.TestCase):
+    """test function format_board, which builds what display_board prints"""
+
+    def test_small_board(self):
+        """check the complete text for a small board"""
+        board = [[0, 1, -1], [-1, -1, 2]]
+        self.assertEqual(minesweep.format_board(board).split('\n'), [
+            '   |       |',
+            '  x| 1 2 3 |',
+            '--------------',
+            'y 2| # # 2 | 2y',
+            'y 1| \u00B7 1 # | 1y',
+            '--------------',
+            '  x| 1 2 3 |',
+            '   |       |'])
+
+    def test_tens_coordinates(self):
+        """check that tens are shown above every tenth column"""
+        board = minesweep.setup_board(12, 3)
+        self.assertEqual(minesweep.format_board(board).split('\n')[0],
+                         '   |' + '  ' * 9 + ' 1' + '  ' * 2 + ' |')
+
+
+class TestViewport(unittest.TestCase):
+    """test class Viewport, and format_board with a viewport"""
+
+    def setUp(self):
+        self.viewport = minesweep.Viewport(200, 120, 20, 10)
+
+    def test_size_limited_to_board(self):
+        """check that a viewport is never larger than the board"""
+        viewport = minesweep.Viewport(5, 4, 20, 10)
+        self.assertEqual((viewport.columns, viewport.rows), (5, 4))
+
+    def test_for_terminal_leaves_room_for_prompt(self):
+        """check that the board, prompt with entry and a message fit on the terminal"""
+        size = os.terminal_size((80, 40))
+        with mock.patch('shutil.get_terminal_size', return_value=size):
+            viewport = minesweep.Viewport.for_terminal(500, 500)
+        prompt_lines = -(-(len(minesweep.MOVES_PROMPT) + minesweep.ENTRY_ROOM) // 80)
+        self.assertEqual(viewport.rows + 8 + prompt_lines + 2, 40)
+        board = minesweep.setup_board(500, 500)
+        self.assertLessEqual(len(minesweep.format_board(board, viewport).split('\n')[0]), 80)
+
+    def test_scroll_stops_at_edges(self):
+        """check that scrolling can't move past the edges of the board"""
+        self.viewport.scroll(-5, -5)
+        self.assertEqual((self.viewport.left, self.viewport.bottom), (0, 0))
+        self.viewport.scroll(1000, 1000)
+        self.assertEqual((self.viewport.left, self.viewport.bottom), (180, 110))
+
+    def test_follow(self):
+        """check that the viewport only moves for locations it doesn't show"""
+        self.assertFalse(self.viewport.follow((19, 9)))
+        self.assertTrue(self.viewport.follow((100, 50)))
+        self.assertEqual((self.viewport.left, self.viewport.bottom), (90, 45))
+
+    def test_format_board_shows_viewport(self):
+        """check that only the viewport is included, with matching coordinates"""
+        board = minesweep.setup_board(200, 120)
+        self.viewport.follow((100, 50))
+        lines = minesweep.format_board(board, self.viewport).split('\n')
+        self.assertEqual(len(lines), 10 + 8)
+        self.assertEqual(lines[0], '    |                   1                   1 |')
+        self.assertEqual(lines[1], '    |                   0                   1 |')
+        self.assertEqual(lines[2], '   x| 1 2 3 4 5 6 7 8 9 0 1 2 3 4 5 6 7 8 9 0 |')
+        self.assertTrue(lines[4].startswith('y 55|'))
+        self.assertTrue(lines[13].endswith('| 46y'))
+        self.assertEqual(lines[-1], lines[0])
+
+    def test_format_board_hundreds_blank_below_100(self):
+        """check that the hundreds are only shown from column 100 on"""
+        board = minesweep.setup_board(120, 1)
+        lines = minesweep.format_board(board).split('\n')
+        self.assertEqual(lines[0].split(), ['|', '1', '1', '1', '|'])
+        self.assertEqual(lines[1].split(), ['|'] + list('123456789012') + ['|'])
+
+
+class TestFormatChanges(unittest.TestCase):
+    """test function format_changes"""
+
+    def test_cursor_positions(self):
+        """check that changed locations are drawn where format_board put them"""
+        board = [[0, 1, -1], [-1, -1, 2]]
+        lines = minesweep.format_board(board).split('\n')
+        changes = minesweep.format_changes(board, [(1, 0), (2, 1)])
+        self.assertTrue(changes.startswith('\x1b[5;8H1\x1b[4;10H2'))
+        # line and column in the escape codes are counted from 1
+        self.assertEqual(lines[5 - 1][8 - 1], '1')
+        self.assertEqual(lines[4 - 1][10 - 1], '2')
+
+    def test_cursor_below_board(self):
+        """check that the cursor ends on the line below the board"""
+        board = minesweep.setup_board(3, 2)
+        self.assertTrue(minesweep.format_changes(board, []).startswith('\x1b[9;1H'))
+
+    def test_wide_board(self):
+        """check that changes land below the extra x coordinate line of wide boards"""
+        board = minesweep.setup_board(100, 2)
+        board[0][99] = 3
+        lines = minesweep.format_board(board).split('\n')
+        self.assertEqual(lines[6 - 1][204 - 1], '3')
+        changes = minesweep.format_changes(board, [(99, 0)])
+        self.assertEqual(changes, '\x1b[6;204H3\x1b[11;1H\x1b[J')
+        self.assertEqual(len(lines), 10)
 
 
 class TestGetMove(unittest.TestCase):
@@ -211,6 +367,11 @@ class TestGetMove(unittest.TestCase):
         with mock.patch('builtins.input', return_value='q'):
             self.assertRaises(SystemExit, minesweep.get_move)
 
+    def test_scroll_entry(self):
+        """check that scroll entries are returned as they are"""
+        with mock.patch('builtins.input', return_value='W'):
+            self.assertEqual(minesweep.get_move(), 'w')
+
     def test_return_is_tuple(self):
         """check that we get a tuple as return value"""
         # note to self: if you use side_effect instead of return_value then the mocked
@@ -231,6 +392,25 @@ class TestGetMove(unittest.TestCase):
             move = minesweep.get_move()
         self.assertTrue(type(move[0]) == int and type(move[1]) == int)
 
+    def test_parse_move(self):
+        """check that parse_move turns human coordinates into computer coordinates"""
+        self.assertEqual(minesweep.parse_move('9 8'), (8, 7))
+
+    def test_parse_moves(self):
+        """check that parse_moves reads a batch of reveals, flags and chords"""
+        self.assertEqual(minesweep.parse_moves('3 4 5 6 F 1 1 2 2 c 4 4 r 9 8'),
+                         [('reveal', (2, 3)), ('reveal', (4, 5)), ('flag', (0, 0)),
+                          ('flag', (1, 1)), ('chord', (3, 3)), ('reveal', (8, 7))])
+        for entry in ['', '3', '3 4 5', 'f 3 c 4', 'x y']:
+            self.assertRaises(ValueError, minesweep.parse_moves, entry)
+
+    def test_get_moves(self):
+        """check that get_moves returns a batch, or scroll entries as they are"""
+        with mock.patch('builtins.input', return_value='1 2 f 3 3'):
+            self.assertEqual(minesweep.get_moves(), [('reveal', (0, 1)), ('flag', (2, 2))])
+        with mock.patch('builtins.input', return_value='D'):
+            self.assertEqual(minesweep.get_moves(), 'd')
+
     def test_return_values(self):
         """check that return values are entry values - 1"""
         with mock.patch('builtins.input', return_value='9 8'):
@@ -321,8 +501,930 @@ class TestCountAdjacentMines(unittest.TestCase):
 # More convenient to test by eye on actual output if it is ever used.
 
 
-# No unit tests for update_board function.
-# Too difficult for now, so chickened out.
+class TestUpdateBoard(unittest.TestCase):
+    """test function update_board"""
+
+    def test_count_is_shown_next_to_mine(self):
+        """check that a move next to a mine only clears that location"""
+        board = minesweep.setup_board(3, 3)
+        revealed = minesweep.update_board((1, 1), board, [(2, 2)], 3, 3)
+        self.assertEqual(revealed, [(1, 1)])
+        self.assertEqual(board[1][1], 1)
+        self.assertEqual(sum(row.count(-1) for row in board), 8)
+
+    def test_zero_clears_until_adjacent_mines(self):
+        """check that a move on a zero clears everything except the mine"""
+        board = minesweep.setup_board(3, 3)
+        revealed = minesweep.update_board((0, 0), board, [(2, 2)], 3, 3)
+        self.assertEqual(len(revealed), 8)
+        self.assertEqual(board, [[0, 0, 0], [0, 1, 1], [0, 1, -1]])
+
+    def test_already_cleared_location(self):
+        """check that clearing a location twice reveals nothing new"""
+        board = minesweep.setup_board(3, 3)
+        minesweep.update_board((0, 0), board, [(2, 2)], 3, 3)
+        self.assertEqual(minesweep.update_board((1, 1), board, [(2, 2)], 3, 3), [])
+
+    def test_stats(self):
+        """check that update_board adds what it did to a stats dict"""
+        board = minesweep.setup_board(3, 3)
+        stats = {}
+        minesweep.update_board((0, 0), board, [(2, 2)], 3, 3, stats=stats)
+        # Zeros at (0, 0), (1, 0), (0, 1), (2, 0) and (0, 2) get their neighbours checked
+        self.assertEqual(stats, {'revealed': 8, 'neighbours_checked': 4 + 6 + 6 + 4 + 4,
+                                 'largest_stack': 2})
+
+    def test_large_empty_board(self):
+        """check that a large empty area does not hit the recursion limit"""
+        width = 400
+        height = 400
+        board = minesweep.setup_board(width, height)
+        revealed = minesweep.update_board((0, 0), board, [(width - 1, height - 1)], width, height)
+        self.assertEqual(len(revealed), width * height - 1)
+        self.assertEqual(len(set(revealed)), len(revealed))
+
+    def test_without_counts_same_as_with(self):
+        """check that without counts only the cleared locations are counted, with the same result"""
+        mines = minesweep.setup_mines(30, 20, 90, random.Random(4))
+        counts = minesweep.setup_counts(mines, 30, 20)
+        for name in (None, 'hexagonal'):
+            topology_counts = minesweep.setup_counts(mines, 30, 20, name)
+            for y in range(0, 20, 3):
+                for x in range(0, 30, 3):
+                    if counts[y][x] == minesweep.MINE:
+                        continue
+                    boards = [minesweep.setup_board(30, 20), minesweep.setup_board(30, 20)]
+                    with mock.patch('minesweep.setup_counts') as mocked_setup_counts:
+                        revealed = minesweep.update_board((x, y), boards[0], mines, 30, 20,
+                                                          topology=name)
+                    mocked_setup_counts.assert_not_called()
+                    self.assertEqual(revealed, minesweep.update_board(
+                        (x, y), boards[1], mines, 30, 20, topology_counts, topology=name))
+                    self.assertEqual(boards[0], boards[1])
+
+
+class TestRegions(unittest.TestCase):
+    """test class Regions"""
+
+    def test_areas_and_three_bv(self):
+        """check the areas of zeros with their numbers, and the 3BV, of a small board"""
+        # Counts with y = 0 at the bottom:
+        # 9 1 0 0 0
+        # 1 1 1 1 1
+        # 0 0 1 9 1
+        counts = minesweep.setup_counts([(3, 0), (0, 2)], 5, 3)
+        regions = minesweep.Regions(counts, 5, 3)
+        self.assertEqual(len(regions), 2)
+        self.assertEqual(regions.label((0, 0)), regions.label((1, 0)))
+        self.assertEqual(regions.label((2, 0)), -1)
+        self.assertEqual(sorted(regions.area(regions.label((3, 2)))),
+                         [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2), (4, 1), (4, 2)])
+        # Both areas, plus the 1 at the bottom right
+        self.assertEqual(regions.isolated, 1)
+        self.assertEqual(regions.three_bv, 3)
+
+    def test_same_as_clearing(self):
+        """check that every area is what update_board clears from one of its zeros"""
+        for seed in range(20):
+            mines = minesweep.setup_mines(20, 15, 40, random.Random(seed))
+            counts = minesweep.setup_counts(mines, 20, 15)
+            regions = minesweep.Regions(counts, 20, 15)
+            for area in map(regions.area, range(len(regions))):
+                x, y = next((x, y) for x, y in area if counts[y][x] == 0)
+                board = minesweep.setup_board(20, 15)
+                revealed = minesweep.update_board((x, y), board, mines, 20, 15, counts)
+                self.assertEqual(sorted(revealed), sorted(area))
+
+    def test_three_bv_is_smallest_number_of_moves(self):
+        """check the 3BV against clearing every area and then every number left"""
+        for seed in range(20):
+            game = minesweep.Game(20, 15, 50, seed=seed)
+            zeros = [(x, y) for y in range(15) for x in range(20) if game.counts[y][x] == 0]
+            numbers = [(x, y) for y in range(15) for x in range(20) if 0 < game.counts[y][x] < 9]
+            moves = 0
+            for x, y in zeros + numbers:
+                if game.board[y][x] < 0:
+                    game.move((x, y))
+                    moves += 1
+            self.assertEqual(game.result, 'won')
+            self.assertEqual(moves, game.three_bv)
+
+    def test_without_regions(self):
+        """check that a game without regions clears the same, and doesn't set them up on a move"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.assertIsNotNone(game._regions)
+        plain = minesweep.Game(3, 3, 1, mines=[(2, 2)], regions=False)
+        self.assertEqual(sorted(plain.move((0, 0))), sorted(game.move((0, 0))))
+        self.assertIsNone(plain._regions)
+        self.assertEqual(plain.three_bv, game.three_bv)
+
+    def test_flag_in_area(self):
+        """check that a flag on a zero blocks clearing its area, as without regions"""
+        mines = [(4, 0)]
+        counts = minesweep.setup_counts(mines, 5, 3)
+        regions = minesweep.Regions(counts, 5, 3)
+        boards = [minesweep.setup_board(5, 3), minesweep.setup_board(5, 3)]
+        for board in boards:
+            for y in range(3):
+                board[y][1] = minesweep.FLAG
+        self.assertEqual(minesweep.update_board((0, 0), boards[0], mines, 5, 3, counts),
+                         minesweep.update_board((0, 0), boards[1], mines, 5, 3, counts,
+                                                regions=regions))
+        self.assertEqual(boards[0], boards[1])
+
+
+class TestTopology(unittest.TestCase):
+    """test the neighbour tables in topology.py, and playing with them"""
+
+    def test_number_of_neighbours(self):
+        """check the number of neighbours in a corner and in the middle"""
+        for name, corner, middle in (('rectangular', 3, 8), ('toroidal', 8, 8),
+                                     ('hexagonal', 2, 6)):
+            starts, _ = topology.neighbour_table(name, 5, 4)
+            self.assertEqual(starts[1] - starts[0], corner)
+            self.assertEqual(starts[1 * 5 + 3] - starts[1 * 5 + 2], middle)
+
+    def test_neighbours_are_mutual(self):
+        """check that if a is a neighbour of b, b is a neighbour of a"""
+        for name in topology.TOPOLOGIES:
+            for width, height in ((5, 4), (2, 2), (1, 3)):
+                starts, table = topology.neighbour_table(name, width, height)
+                for i in range(width * height):
+                    adjacent = table[starts[i]:starts[i + 1]]
+                    self.assertNotIn(i, adjacent)
+                    self.assertEqual(len(set(adjacent)), len(adjacent))
+                    for j in adjacent:
+                        self.assertIn(i, table[starts[j]:starts[j + 1]])
+
+    def test_moves_use_table_of_game(self):
+        """check that moves don't look up the neighbour table again"""
+        games = [minesweep.Game(30, 20, 60, seed=1, topology=name) for name in topology.TOPOLOGIES]
+        with mock.patch('minesweep.neighbour_table') as mocked_table:
+            for game in games:
+                for y in range(20):
+                    for x in range(30):
+                        if game.counts[y][x] != minesweep.MINE:
+                            game.move((x, y))
+        mocked_table.assert_not_called()
+
+    def test_rectangular_table_is_usual_board(self):
+        """check that the rectangular table gives the same counts and clearing as without"""
+        mines = minesweep.setup_mines(20, 15, 40, random.Random(3))
+        counts = minesweep.setup_counts(mines, 20, 15, 'rectangular')
+        self.assertEqual(counts, minesweep.setup_counts(mines, 20, 15))
+        self.assertEqual(minesweep.count_adjacent_mines((4, 4), mines, 20, 15, 'rectangular'),
+                         minesweep.count_adjacent_mines((4, 4), mines, 20, 15))
+        for y in range(15):
+            for x in range(20):
+                if counts[y][x] == minesweep.MINE:
+                    continue
+                boards = [minesweep.setup_board(20, 15), minesweep.setup_board(20, 15)]
+                minesweep.update_board((x, y), boards[0], mines, 20, 15, counts)
+                minesweep.update_board((x, y), boards[1], mines, 20, 15, counts,
+                                       topology='rectangular')
+                self.assertEqual(boards[0], boards[1])
+
+    def test_toroidal_wraps_around(self):
+        """check that a mine in a corner is counted in the opposite corner"""
+        counts = minesweep.setup_counts([(0, 0)], 4, 4, 'toroidal')
+        self.assertEqual(counts[3][3], 1)
+        self.assertEqual(counts[2][2], 0)
+        game = minesweep.Game(4, 4, 1, mines=[(0, 0)], topology='toroidal')
+        self.assertEqual(len(game.move((2, 2))), 15)
+        self.assertEqual(game.result, 'won')
+
+    def test_three_bv(self):
+        """check the 3BV against clearing every area and then every number left"""
+        for name in ('toroidal', 'hexagonal'):
+            for seed in range(10):
+                game = minesweep.Game(12, 10, 20, seed=seed, topology=name)
+                locations = sorted(((x, y) for y in range(10) for x in range(12)
+                                    if game.counts[y][x] != minesweep.MINE),
+                                   key=lambda location: game.counts[location[1]][location[0]])
+                moves = 0
+                for x, y in locations:
+                    if game.board[y][x] < 0:
+                        game.move((x, y))
+                        moves += 1
+                self.assertEqual(game.result, 'won')
+                self.assertEqual(moves, game.three_bv)
+
+    def test_hexagonal_display(self):
+        """check that odd rows are shifted on a hexagonal board"""
+        lines = minesweep.format_board(minesweep.setup_board(3, 2), topology='hexagonal').split('\n')
+        self.assertEqual(lines[3], 'y 2|  # # # | 2y')
+        self.assertEqual(lines[4], 'y 1| # # #  | 1y')
+
+
+class TestGame(unittest.TestCase):
+    """test class Game"""
+
+    def test_same_seed_gives_same_mines(self):
+        """check that two games with the same seed have the same mines"""
+        self.assertEqual(minesweep.Game(9, 9, 10, seed=5).mines,
+                         minesweep.Game(9, 9, 10, seed=5).mines)
+
+    def test_mine_hit_loses(self):
+        """check that a move on a mine loses the game"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.assertEqual(game.move((2, 2)), [])
+        self.assertEqual(game.result, 'lost')
+        self.assertTrue(game.over)
+
+    def test_clearing_everything_wins(self):
+        """check that clearing all locations without mines wins the game"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.assertEqual(len(game.move((0, 0))), 8)
+        self.assertEqual(game.result, 'won')
+        self.assertEqual(game.covered, 1)
+
+    def test_move_outside_board(self):
+        """check that a move outside the board is rejected"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.assertRaises(ValueError, game.move, (3, 0))
+        self.assertRaises(ValueError, game.move, (0, -1))
+        self.assertEqual(game.moves, 0)
+
+    def test_flag_and_unflag(self):
+        """check that flagging a covered location shows F, and protects it from moves"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.assertTrue(game.flag((0, 0)))
+        self.assertEqual(game.board[0][0], minesweep.FLAG)
+        self.assertEqual(minesweep.format_board(game.board).count('F'), 1)
+        self.assertEqual(game.move((0, 0)), [])
+        self.assertTrue(game.flag((0, 0)))
+        self.assertEqual(game.board[0][0], -1)
+
+    def test_flood_fill_skips_flags(self):
+        """check that clearing an area leaves flagged locations covered"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        game.flag((0, 2))
+        self.assertEqual(len(game.move((0, 0))), 7)
+        self.assertEqual(game.board[2][0], minesweep.FLAG)
+        self.assertIsNone(game.result)
+
+    def test_chord(self):
+        """check that chording clears the neighbours of a number whose mine is flagged"""
+        game = minesweep.Game(3, 3, 2, mines=[(2, 2), (2, 0)])
+        game.move((1, 1))
+        self.assertEqual(game.play([('chord', (1, 1))]), [])
+        game.play([('flag', (2, 2)), ('flag', (2, 0))])
+        self.assertEqual(len(game.play([('chord', (1, 1))])), 6)
+        self.assertEqual(game.result, 'won')
+
+    def test_chord_on_wrong_flag_loses(self):
+        """check that chording with a flag in the wrong place hits the mine"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        game.move((1, 1))
+        game.flag((0, 0))
+        game.play([('chord', (1, 1))])
+        self.assertEqual(game.result, 'lost')
+
+    def test_batch(self):
+        """check that a batch gives the same board as its moves one by one"""
+        game = minesweep.Game(16, 16, 40, seed=2)
+        single = minesweep.Game(16, 16, 40, seed=2)
+        moves = [(x, x) for x in range(0, 16, 3) if (x, x) not in game.mines]
+        changed = game.play([('reveal', move) for move in moves] + [('flag', (15, 0))])
+        for move in moves:
+            single.move(move)
+        single.flag((15, 0))
+        self.assertEqual(game.board, single.board)
+        self.assertEqual(game.covered, single.covered)
+        self.assertEqual(len(changed), 16 * 16 - game.covered + 1)
+
+    def test_batch_outside_board(self):
+        """check that nothing in a batch is applied if a location is outside the board"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.assertRaises(ValueError, game.play, [('flag', (0, 0)), ('reveal', (3, 3))])
+        self.assertEqual(game.board, minesweep.setup_board(3, 3))
+
+
+class TestCompactGame(unittest.TestCase):
+    """test class CompactGame in compact.py against Game"""
+
+    def test_same_as_game(self):
+        """check that the same moves give the same board and result as Game"""
+        for seed in range(10):
+            game = minesweep.Game(20, 12, 40, seed=seed)
+            compact_game = compact.CompactGame(20, 12, 40, seed=seed)
+            rng = random.Random(seed)
+            while not game.over:
+                move = (rng.randrange(20), rng.randrange(12))
+                self.assertEqual(sorted(compact_game.move(move)), sorted(game.move(move)))
+            self.assertEqual(compact_game.result, game.result)
+            self.assertEqual(compact_game.rows(), game.board)
+            self.assertEqual(compact_game.reveal_board(), game.counts)
+            self.assertEqual(sorted(compact_game.mines), sorted(game.mines))
+
+    def test_count_adjacent_mines(self):
+        """check that count_adjacent_mines equals the function of the same name"""
+        mines = [(2, 2), (2, 1), (1, 2), (0, 0)]
+        compact_game = compact.CompactGame(3, 3, 4, mines=mines)
+        self.assertEqual(compact_game.count_adjacent_mines((1, 1)),
+                         minesweep.count_adjacent_mines((1, 1), mines, 3, 3))
+
+    def test_one_byte_per_location(self):
+        """check that the board takes a single byte per location, and no attribute dict"""
+        compact_game = compact.CompactGame(30, 16, 99, seed=1)
+        self.assertEqual(len(compact_game.cells), 30 * 16)
+        self.assertFalse(hasattr(compact_game, '__dict__'))
+
+
+class TestBitboardGame(unittest.TestCase):
+    """test class BitboardGame and the functions in bitboard.py against Game"""
+
+    def test_same_as_game(self):
+        """check that the same moves give the same board and result as Game"""
+        for seed in range(10):
+            game = minesweep.Game(20, 12, 30, seed=seed)
+            bitboard_game = bitboard.BitboardGame(20, 12, 30, seed=seed)
+            rng = random.Random(seed)
+            while not game.over:
+                move = (rng.randrange(20), rng.randrange(12))
+                revealed = bitboard_game.move(move)
+                self.assertEqual(bitboard.count_bits(revealed), len(game.move(move)))
+            self.assertEqual(bitboard_game.result, game.result)
+            self.assertEqual(bitboard_game.to_board(), game.board)
+
+    def test_reveal_board(self):
+        """check that counts for a whole board equal setup_counts"""
+        mines = [(0, 0), (4, 0), (0, 3), (4, 3), (2, 1)]
+        bits = sum(1 << (y * 5 + x) for x, y in mines)
+        self.assertEqual(bitboard.reveal_board(bits, 5, 4), minesweep.setup_counts(mines, 5, 4))
+
+    def test_no_wrap_around(self):
+        """check that a mine in the right column isn't counted in the next row's left column"""
+        bits = 1 << (0 * 4 + 3)
+        self.assertEqual(bitboard.count_adjacent_mines((0, 1), bits, 4, 3), 0)
+        self.assertEqual(bitboard.count_adjacent_mines((2, 1), bits, 4, 3), 1)
+
+    def test_large_opening(self):
+        """check that an opening taller than the first band of rows is cleared completely"""
+        mines = [(x, 30) for x in range(10)]
+        bits = sum(1 << (y * 10 + x) for x, y in mines)
+        cleared = bitboard.update_board((5, 0), 0, bits, 10, 31)
+        self.assertEqual(bitboard.count_bits(cleared), 300)
+
+
+class TestAnalytics(unittest.TestCase):
+    """test scoring boards with analytics.py"""
+
+    def test_score_board(self):
+        """check that a score matches the board for its seed"""
+        score = analytics.score_board(16, 16, 40, 7)
+        game = minesweep.Game(16, 16, 40, seed=7)
+        self.assertEqual(sorted(score), sorted(analytics.FIELDS))
+        self.assertEqual(score['three_bv'], game.three_bv)
+        self.assertEqual(score['openings'], len(game.regions))
+        self.assertTrue(0 < score['solvable'] <= 1)
+
+    def test_no_openings(self):
+        """check that a board without zeros can't be solved without guessing"""
+        score = analytics.score_board(3, 3, 8, 1)
+        self.assertEqual((score['openings'], score['solvable']), (0, 0.0))
+
+    def test_processes_give_same_scores(self):
+        """check that scoring over worker processes gives the same scores, in order"""
+        scores = list(analytics.iter_scores(9, 9, 10, 5, 23))
+        self.assertEqual([score['seed'] for score in scores], list(range(5, 28)))
+        self.assertEqual(list(analytics.iter_scores(9, 9, 10, 5, 23, processes=2, shard_size=4)),
+                         scores)
+
+    def test_write(self):
+        """check that scores are written as CSV with a header, and as JSON lines"""
+        scores = list(analytics.iter_scores(9, 9, 10, 0, 3))
+        for write, lines in ((analytics.write_csv, 4), (analytics.write_jsonl, 3)):
+            with tempfile.TemporaryFile('w+', newline='') as file:
+                self.assertEqual(write(iter(scores), file), 3)
+                file.seek(0)
+                self.assertEqual(len(file.read().splitlines()), lines)
+
+
+class TestRunGames(unittest.TestCase):
+    """test function run_games in simulation.py"""
+
+    def test_all_games_finish(self):
+        """check that the requested number of games gets played"""
+        stats = simulation.run_games(simulation.random_strategy, 20, 9, 9, 10, seed=1)
+        self.assertEqual(stats['games'], 20)
+        self.assertGreaterEqual(stats['moves'], 20)
+        self.assertTrue(0 <= stats['won'] <= 20)
+
+    def test_seed_is_reproducible(self):
+        """check that the same seed gives the same results"""
+        first = simulation.run_games(simulation.random_strategy, 20, 9, 9, 10, seed=1)
+        second = simulation.run_games(simulation.random_strategy, 20, 9, 9, 10, seed=1)
+        self.assertEqual((first['won'], first['moves']), (second['won'], second['moves']))
+
+
+class TestRunBatch(unittest.TestCase):
+    """test function run_batch in simulation.py"""
+
+    def test_same_results_as_run_games(self):
+        """check that spreading games over processes gives the same results"""
+        batch = simulation.run_batch(simulation.random_strategy, 30, 9, 9, 10,
+                                     seed=1, processes=2, shard_size=7)
+        single = simulation.run_games(simulation.random_strategy, 30, 9, 9, 10, seed=1)
+        self.assertEqual((batch['games'], batch['won'], batch['moves']),
+                         (single['games'], single['won'], single['moves']))
+
+    def test_no_games(self):
+        """check that a batch without games gives zeroed totals"""
+        batch = simulation.run_batch(simulation.random_strategy, 0, 9, 9, 10, processes=1)
+        self.assertEqual((batch['games'], batch['win_rate']), (0, 0.0))
+
+    def test_main_needs_games(self):
+        """check that main rejects --games below 1"""
+        with mock.patch('sys.stderr', new_callable=io.StringIO):
+            self.assertRaises(SystemExit, simulation.main, ['--games', '0', '--processes', '1'])
+
+
+class TestSolver(unittest.TestCase):
+    """test class Solver in solver.py"""
+
+    def test_single_count_rule(self):
+        """check that a 1 in a corner with one unknown neighbour finds the mine"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        game.board[1][1] = 1
+        game.board[1][2] = 1
+        game.board[2][1] = 1
+        game.board[0] = [0, 0, 0]
+        game.board[1][0] = 0
+        game.board[2][0] = 0
+        board_solver = solver.Solver(game.board)
+        board_solver.update([(1, 1)])
+        safe, mines = board_solver.solve()
+        self.assertEqual(mines, {(2, 2)})
+        self.assertEqual(safe, set())
+
+    def test_subset_rule(self):
+        """check the 1-1 pattern along an edge: the third location is safe"""
+        # Bottom row cleared as 1 1 2 #, with the row above still covered
+        game = minesweep.Game(4, 2, 2, mines=[(1, 1), (3, 1)])
+        for x in range(3):
+            game.move((x, 0))
+        board_solver = solver.Solver(game.board)
+        board_solver.update([(0, 0), (1, 0), (2, 0)])
+        safe, mines = board_solver.solve()
+        self.assertEqual(safe, {(2, 1)})
+        self.assertEqual(mines, set())
+
+    def test_conclusions_are_correct(self):
+        """check that whatever the solver concludes during games is true"""
+        for seed in range(20):
+            game = minesweep.Game(16, 16, 40, seed=seed)
+            strategy = solver.SolverStrategy()
+            rng = random.Random(seed)
+            while not game.over:
+                move = strategy(game, rng)
+                self.assertTrue(all(game.counts[y][x] == minesweep.MINE
+                                    for x, y in strategy.solver.mines))
+                self.assertTrue(all(game.counts[y][x] != minesweep.MINE
+                                    for x, y in strategy.solver.safe))
+                game.move(move)
+
+
+class TestMineProbabilities(unittest.TestCase):
+    """test function mine_probabilities in hints.py"""
+
+    def test_surrounded_count(self):
+        """check that a 1 in the middle spreads its mine over all neighbours"""
+        board = minesweep.setup_board(3, 3)
+        board[1][1] = 1
+        probabilities = hints.mine_probabilities(board, 1)
+        self.assertEqual(len(probabilities), 8)
+        self.assertTrue(all(p == 1 / 8 for p in probabilities.values()))
+
+    def test_frontier_and_interior(self):
+        """check a forced mine next to a count, with the other mine anywhere else"""
+        board = [[1, -1, -1, -1]]
+        probabilities = hints.mine_probabilities(board, 2)
+        self.assertEqual(probabilities, {(1, 0): 1, (2, 0): 0.5, (3, 0): 0.5})
+        self.assertEqual(hints.hint(board, 2), ((2, 0), 0.5))
+
+    def test_independent_groups(self):
+        """check that separate groups are weighted by the total number of mines"""
+        # Two separate 1's, each with two covered neighbours, and one location
+        # next to neither of them; with 2 mines, that location can't be a mine.
+        board = [[-1, 1, -1, -1, -1, 1, -1]]
+        probabilities = hints.mine_probabilities(board, 2)
+        self.assertEqual(probabilities[(3, 0)], 0)
+        self.assertEqual(probabilities[(0, 0)], 0.5)
+
+    def test_long_frontier(self):
+        """check a group with more locations than the recursion limit allows"""
+        # A cleared row of 1's on top of a covered row of 1100 locations: the
+        # mines are every third location, starting on the first or the second.
+        width = 1100
+        board = [[-1] * width, [1] * width]
+        probabilities = hints.mine_probabilities(board, 367)
+        self.assertEqual(len(probabilities), width)
+        self.assertEqual([probabilities[(x, 0)] for x in range(6)], [0.5, 0.5, 0, 0.5, 0.5, 0])
+
+    def test_impossible_board(self):
+        """check that a board that can't have this many mines is rejected"""
+        self.assertRaises(ValueError, hints.mine_probabilities, [[1, -1, 0]], 2)
+
+
+class TestChunkedGame(unittest.TestCase):
+    """test classes ChunkedMinefield and ChunkedGame in chunked.py"""
+
+    def test_mines_do_not_depend_on_order(self):
+        """check that chunks get the same mines whichever is set up first"""
+        first = chunked.ChunkedMinefield(3, 40, 16)
+        second = chunked.ChunkedMinefield(3, 40, 16)
+        locations = [(x, y) for y in range(-20, 20) for x in range(-20, 20)]
+        first_mines = [first.is_mine(location) for location in locations]
+        second_mines = [second.is_mine(location) for location in reversed(locations)]
+        self.assertEqual(first_mines, second_mines[::-1])
+
+    def test_mines_per_chunk(self):
+        """check that every chunk has the requested number of mines"""
+        minefield = chunked.ChunkedMinefield(3, 40, 16)
+        self.assertEqual(sum(minefield.is_mine((x, y)) for y in range(16, 32)
+                             for x in range(-16, 0)), 40)
+
+    def test_only_explored_chunks_are_set_up(self):
+        """check that looking at the board doesn't set up any chunks"""
+        game = chunked.ChunkedGame(3, 40, 16)
+        self.assertEqual(game.window(-1000, -1000, 10, 10), minesweep.setup_board(10, 10))
+        self.assertEqual(game.minefield.chunks, {})
+        self.assertEqual(game.board_chunks, {})
+
+    def test_move_clears_empty_area(self):
+        """check that a move clears the whole empty area and its counts"""
+        game = chunked.ChunkedGame(5, 50, 16)
+        location = next((x, 0) for x in range(100) if game.minefield.count((x, 0)) == 0)
+        revealed = game.move(location)
+        self.assertGreater(len(revealed), 1)
+        for x, y in revealed:
+            self.assertEqual(game.value((x, y)), game.minefield.count((x, y)))
+            if game.value((x, y)) == 0:
+                self.assertTrue(all(game.value((ix, iy)) >= 0
+                                    for iy in range(y - 1, y + 2) for ix in range(x - 1, x + 2)))
+
+    def test_move_resumes_after_max_reveal(self):
+        """check that an area cut off by max_reveal is cleared by the next moves"""
+        whole = chunked.ChunkedGame(5, 50, 16)
+        game = chunked.ChunkedGame(5, 50, 16, max_reveal=20)
+        location = next((x, 0) for x in range(100) if whole.minefield.count((x, 0)) == 0)
+        area = whole.move(location)
+        self.assertGreater(len(area), 40)
+        revealed = game.move(location)
+        self.assertLess(len(revealed), len(area))
+        self.assertTrue(game.pending)
+        while game.pending:
+            revealed += game.move(location)
+        self.assertEqual(sorted(revealed), sorted(area))
+
+    def test_mine_hit_loses(self):
+        """check that a move on a mine ends the game"""
+        game = chunked.ChunkedGame(3, 255, 16)
+        for x in range(16):
+            game.move((x, 0))
+        self.assertEqual(game.result, 'lost')
+
+
+class TestGenerateBoard(unittest.TestCase):
+    """test function generate_board in boardpool.py"""
+
+    def test_start_clears_an_area(self):
+        """check that the start location is free of mines, and so are its neighbours"""
+        mines, start = boardpool.generate_board(9, 9, 10, random.Random(1), no_guess=False)
+        self.assertEqual(len(mines), 10)
+        self.assertEqual(minesweep.count_adjacent_mines(start, mines, 9, 9), 0)
+
+    def test_no_guess_board_is_solvable(self):
+        """check that the solver can clear a no-guess board from its start location"""
+        mines, start = boardpool.generate_board(16, 16, 40, random.Random(2))
+        self.assertTrue(boardpool.solvable(16, 16, 40, mines, start))
+
+    def test_time_limit(self):
+        """check that a board that can't be solved without guessing is given up on"""
+        started = time.monotonic()
+        self.assertRaises(ValueError, boardpool.generate_board, 9, 9, 60, random.Random(1),
+                          time_limit=0.2)
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_dense_board_keeps_start_free(self):
+        """check that boards too dense for a free area still have a safe start"""
+        mines, start = boardpool.generate_board(3, 3, 8, random.Random(3), no_guess=False)
+        self.assertNotIn(start, mines)
+
+
+class TestBoardPool(unittest.TestCase):
+    """test class BoardPool in boardpool.py"""
+
+    def setUp(self):
+        self.pool = boardpool.BoardPool(boards_per_size=2, seed=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_get_without_ready_boards(self):
+        """check that a board is generated right away when none are ready"""
+        mines, start = self.pool.get(9, 9, 10)
+        self.assertEqual(len(mines), 10)
+        self.assertNotIn(start, mines)
+
+    def test_pool_gets_filled(self):
+        """check that the background thread fills the pool for a size"""
+        self.pool.prepare(9, 9, 10)
+        for _ in range(100):
+            if self.pool.ready(9, 9, 10) == 2:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.pool.ready(9, 9, 10), 2)
+        self.pool.get(9, 9, 10)
+        self.assertEqual(self.pool.ready(9, 9, 10), 1)
+
+    def test_dense_size_is_given_up(self):
+        """check that a size without boards that can be solved without guessing
+        still gets boards, and doesn't keep the background thread busy"""
+        pool = boardpool.BoardPool(boards_per_size=2, seed=1, time_limit=0.2)
+        started = time.monotonic()
+        pool.prepare(9, 9, 60)
+        mines, start = pool.get(9, 9, 60)
+        self.assertEqual(len(mines), 60)
+        self.assertNotIn(start, mines)
+        pool.close()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertIn((9, 9, 60), pool.given_up)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """test functions run_benchmarks and compare in benchmarks.py"""
+
+    def test_all_functions_are_timed(self):
+        """check that every function gets a time for every size and density"""
+        results = benchmarks.run_benchmarks([(9, 9)], [0.1, 0.2], repeat=1)
+        self.assertEqual(len(results), 18)
+        self.assertIn('update_board[9x9@0.10]', results)
+        self.assertIn('bitboard_open_zero[9x9@0.20]', results)
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+
+    def test_compare(self):
+        """check that only benchmarks slower than the tolerance are reported"""
+        baseline = {'a': 1.0, 'b': 1.0, 'c': 1.0}
+        results = {'a': 1.2, 'b': 1.3, 'd': 5.0}
+        self.assertEqual(benchmarks.compare(results, baseline, 0.25), [('b', 1.0, 1.3)])
+
+
+class TestSaveFile(unittest.TestCase):
+    """test saving and loading games with savefile.py"""
+
+    def setUp(self):
+        self.game = minesweep.Game(37, 11, 50, seed=8)
+        for move in [(0, 0), (20, 5), (36, 10), (5, 9)]:
+            if self.game.counts[move[1]][move[0]] != minesweep.MINE:
+                self.game.move(move)
+        self.flagged = next((x, y) for y in range(11) for x in range(37)
+                            if self.game.board[y][x] == -1)
+        self.game.flag(self.flagged)
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        savefile.save_game(self.game, self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_file_size(self):
+        """check that the file holds 7 bits per location plus the header"""
+        self.assertEqual(os.path.getsize(self.path),
+                         savefile.HEADER.size + 3 * ((37 * 11 + 7) // 8) + (37 * 11 + 1) // 2)
+
+    def test_load_game(self):
+        """check that a loaded game equals the saved one"""
+        loaded = savefile.load_game(self.path)
+        self.assertEqual(sorted(loaded.mines), sorted(self.game.mines))
+        self.assertEqual(loaded.board, self.game.board)
+        self.assertEqual(loaded.board[self.flagged[1]][self.flagged[0]], minesweep.FLAG)
+        self.assertEqual((loaded.seed, loaded.covered), (8, self.game.covered))
+
+    def test_not_a_saved_game(self):
+        """check that other files are rejected"""
+        with open(self.path, 'wb') as file:
+            file.write(bytes(100))
+        self.assertRaises(ValueError, savefile.load_game, self.path)
+
+    def test_mapped_board(self):
+        """check that a memory-mapped board shows the same as the saved game"""
+        with savefile.MappedBoard(self.path) as mapped:
+            self.assertEqual(mapped.window(0, 0, 37, 11), self.game.board)
+            self.assertEqual(mapped.count((3, 4)), self.game.counts[4][3])
+
+    def test_mapped_move(self):
+        """check that moves on a writable mapped board end up in the file"""
+        move = next((x, y) for y in range(11) for x in range(37)
+                    if self.game.board[y][x] == -1 and self.game.counts[y][x] != minesweep.MINE)
+        with savefile.MappedBoard(self.path, writable=True) as mapped:
+            revealed = mapped.move(move)
+        self.assertEqual(sorted(revealed), sorted(self.game.move(move)))
+        self.assertEqual(savefile.load_game(self.path).board, self.game.board)
+
+    def test_lost_game(self):
+        """check that a lost game loads as lost, also when lost on a mapped board"""
+        mine = self.game.mines[0]
+        with savefile.MappedBoard(self.path, writable=True) as mapped:
+            self.assertIsNone(mapped.result)
+            self.assertEqual(mapped.move(mine), [])
+            self.assertEqual(mapped.move((0, 0)), [])
+        self.assertEqual(savefile.load_game(self.path).result, 'lost')
+        self.game.move(mine)
+        savefile.save_game(self.game, self.path)
+        loaded = savefile.load_game(self.path)
+        self.assertEqual((loaded.result, loaded.board), ('lost', self.game.board))
+
+    def test_mapped_won_game(self):
+        """check that clearing the last location on a mapped board saves it as won"""
+        game = minesweep.Game(3, 1, 1, mines=[(0, 0)])
+        savefile.save_game(game, self.path)
+        with savefile.MappedBoard(self.path, writable=True) as mapped:
+            self.assertEqual(mapped.covered, 3)
+            self.assertEqual(sorted(mapped.move((2, 0))), [(1, 0), (2, 0)])
+            self.assertEqual(mapped.result, 'won')
+        self.assertEqual(savefile.load_game(self.path).result, 'won')
+
+    def test_mapped_move_outside_board(self):
+        """check that moves outside the board are refused and leave the file alone"""
+        with open(self.path, 'rb') as file:
+            saved = file.read()
+        with savefile.MappedBoard(self.path, writable=True) as mapped:
+            for move in [(37, 0), (-1, 0), (0, 11), (0, -1)]:
+                self.assertRaises(ValueError, mapped.move, move)
+        with open(self.path, 'rb') as file:
+            self.assertEqual(file.read(), saved)
+
+    def test_mapped_flag_not_cleared(self):
+        """check that a move on a flagged location leaves it flagged"""
+        with savefile.MappedBoard(self.path, writable=True) as mapped:
+            self.assertEqual(mapped.move(self.flagged), [])
+            self.assertEqual(mapped.value(self.flagged), minesweep.FLAG)
+
+
+class TestMoveLog(unittest.TestCase):
+    """test logging and replaying games with movelog.py"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def log_game(self, game, moves):
+        log = movelog.MoveLog(self.path, game)
+        for move in moves:
+            game.move(move)
+            log.record(move)
+            if game.over:
+                log.finish(game)
+                return
+        log.close()
+
+    def test_replay_with_seed(self):
+        """check that replaying a logged game ends the same"""
+        game = minesweep.Game(16, 16, 40, seed=3)
+        self.log_game(game, [(x, x) for x in range(16)])
+        [(replayed, recorded)] = movelog.replay_file(self.path)
+        self.assertEqual(replayed.board, game.board)
+        self.assertEqual(recorded, (game.result, game.covered))
+
+    def test_replay_with_mines(self):
+        """check that games without a seed are logged with their mines"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.log_game(game, [(0, 0)])
+        [(replayed, recorded)] = movelog.replay_file(self.path)
+        self.assertEqual(replayed.result, 'won')
+        self.assertEqual(recorded, ('won', 1))
+
+    def test_verify_many_games(self):
+        """check that all games appended to a log are replayed and verified"""
+        for seed in range(5):
+            self.log_game(minesweep.Game(9, 9, 10, seed=seed), [(4, 4), (0, 0), (8, 8)])
+        results = list(movelog.verify_logs([self.path]))
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(correct for _, correct, _ in results))
+
+    def test_verify_finds_mismatch(self):
+        """check that a log with a wrong result is reported"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        self.log_game(game, [(0, 0)])
+        with open(self.path, 'a') as file:
+            file.write(movelog.HEADER + ' 3 3 1\nmines 2 2\n0 0\nresult lost 1\n')
+        self.assertEqual([correct for _, correct, _ in movelog.verify_logs([self.path])],
+                         [True, False])
+
+    def test_play_game_log(self):
+        """check that play_game logs every move it accepts"""
+        with mock.patch('minesweep.setup_mines', return_value=[(2, 2)]), \
+                mock.patch('minesweep.display_board'), \
+                mock.patch('builtins.print'), \
+                mock.patch('builtins.input', side_effect=['4 4', '3 2', '1 1']):
+            minesweep.play_game(3, 3, 1, log_path=self.path)
+        with open(self.path) as file:
+            lines = file.read().split('\n')
+        self.assertEqual(lines[2:], ['2 1', '0 0', 'result won 1', ''])
+
+    def test_replay_with_topology(self):
+        """check that the topology of a game is logged and used for the replay"""
+        game = minesweep.Game(9, 9, 10, seed=4, topology='hexagonal')
+        self.log_game(game, [(x, 8 - x) for x in range(9)])
+        [(replayed, recorded)] = movelog.replay_file(self.path)
+        self.assertEqual(replayed.topology, 'hexagonal')
+        self.assertEqual(replayed.board, game.board)
+
+    def test_replay_batches(self):
+        """check that batches with flags and chords are logged on one line and replayed"""
+        game = minesweep.Game(3, 3, 2, mines=[(2, 2), (2, 0)])
+        log = movelog.MoveLog(self.path, game)
+        for moves in [[('reveal', (1, 1))], [('flag', (2, 2)), ('flag', (2, 0)), ('chord', (1, 1))]]:
+            game.play(moves)
+            log.record_moves(moves)
+        log.finish(game)
+        with open(self.path) as file:
+            self.assertIn('f 2 2 2 0 c 1 1\n', file.read())
+        [(replayed, recorded)] = movelog.replay_file(self.path)
+        self.assertEqual(replayed.board, game.board)
+        self.assertEqual(recorded, ('won', 2))
+
+
+class TestServer(unittest.TestCase):
+    """test the game server in server.py"""
+
+    def test_new_game_and_move(self):
+        """check that a new game can be started and played"""
+        game, reply, done = server.handle_command(None, 'new 3 3 1\n')
+        self.assertEqual(reply[-1], 'status playing')
+        game.mines[:] = [(2, 2)]
+        game.counts = minesweep.setup_counts(game.mines, 3, 3)
+        game._regions = minesweep.Regions(game.counts, 3, 3)
+        game, reply, done = server.handle_command(game, '3 2 f 3 3\n')
+        self.assertEqual(reply[0], 'changed 3 3 F 3 2 1')
+        game, reply, done = server.handle_command(game, '1 1\n')
+        self.assertEqual(len(reply[0].split()), 1 + 3 * 7)
+        self.assertEqual(reply[-1], 'status won')
+        self.assertFalse(done)
+        _, reply, _ = server.handle_command(game, 'board')
+        self.assertEqual(reply[0], minesweep.format_board(game.board))
+
+    def test_board_window(self):
+        """check that only part of a large board is sent, from where it is asked for"""
+        game, reply, _ = server.handle_command(None, 'new 200 100 10')
+        self.assertEqual(reply[0].count('\n'), server.VIEW_ROWS + 7)
+        _, reply, _ = server.handle_command(game, 'board 101 51')
+        viewport = minesweep.Viewport(200, 100, server.VIEW_COLUMNS, server.VIEW_ROWS)
+        viewport.scroll(100, 50)
+        self.assertEqual(reply[0], minesweep.format_board(game.board, viewport))
+
+    def test_errors_do_not_end_session(self):
+        """check that invalid commands get an error, and the session goes on"""
+        for line in ['1 1', 'new 2 3 1', 'new 3 3 9', 'new x']:
+            game, reply, done = server.handle_command(None, line)
+            self.assertIsNone(game)
+            self.assertFalse(done)
+            self.assertEqual(reply[-1], 'status none')
+        game, _, _ = server.handle_command(None, 'new 9 9 10')
+        for line in ['10 1', 'a b', '5']:
+            _, reply, done = server.handle_command(game, line)
+            self.assertTrue(reply[0].startswith('ERROR'))
+            self.assertFalse(done)
+
+    def test_new_game_with_topology(self):
+        """check that a new game can have a topology, and an unknown one is an error"""
+        game, reply, done = server.handle_command(None, 'new 5 5 3 toroidal')
+        self.assertEqual(game.topology, 'toroidal')
+        _, reply, _ = server.handle_command(None, 'new 5 5 3 round')
+        self.assertTrue(reply[0].startswith('ERROR'))
+
+    def test_quit(self):
+        """check that q ends the session"""
+        self.assertTrue(server.handle_command(None, 'q')[2])
+
+    def test_many_sessions(self):
+        """check that several connections are served at the same time"""
+        async def session(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'new 9 9 10\n5 5\nq\n')
+            data = await reader.read()
+            writer.close()
+            return data.decode()
+
+        async def run():
+            game_server = await server.serve(port=0)
+            port = game_server.sockets[0].getsockname()[1]
+            replies = await asyncio.gather(*(session(port) for _ in range(20)))
+            game_server.close()
+            await game_server.wait_closed()
+            return replies
+
+        replies = asyncio.run(run())
+        self.assertTrue(all(reply.endswith('Thanks for playing.\n') for reply in replies))
+        # One status line after connecting, and one for each of the two commands
+        self.assertTrue(all(reply.count('\nstatus ') == 3 for reply in replies))
 
 
 class TestPlayGame(unittest.TestCase):
@@ -339,6 +1441,164 @@ class TestPlayGame(unittest.TestCase):
         with mock.patch('builtins.input', side_effect=['2 2', ]):
             self.assertRaises(SystemExit, minesweep.play_game, width, height, number_of_mines, mines, board)
 
+    def test_metrics(self):
+        """check that metrics get a record for every move, and a summary is printed"""
+        records = []
+        game_metrics = metrics.GameMetrics(records.append)
+        with mock.patch('minesweep.setup_mines', return_value=[(2, 2)]), \
+                mock.patch('minesweep.display_board'), \
+                mock.patch('builtins.print') as mocked_print, \
+                mock.patch('builtins.input', side_effect=['3 2', '1 1']):
+            minesweep.play_game(3, 3, 1, metrics=game_metrics)
+        self.assertEqual(records, game_metrics.records)
+        self.assertEqual([record['revealed'] for record in records], [1, 7])
+        self.assertTrue(all(record['render_seconds'] <= record['seconds'] for record in records))
+        self.assertEqual(game_metrics.summary()['revealed'], 8)
+        self.assertIn('2 moves', mocked_print.call_args[0][0])
+
+    def test_win_after_clearing_everything(self):
+        """check that the game is won once only the mines remain covered"""
+        with mock.patch('minesweep.setup_mines', return_value=[(2, 2)]), \
+                mock.patch('minesweep.display_board'), \
+                mock.patch('builtins.print') as mocked_print, \
+                mock.patch('builtins.input', side_effect=['1 1']):
+            minesweep.play_game(3, 3, 1)
+        self.assertIn('Congratulations', mocked_print.call_args[0][0])
+
+    def test_batch_is_displayed_once(self):
+        """check that a batch of moves is applied and displayed in one go"""
+        with mock.patch('minesweep.setup_mines', return_value=[(1, 0), (1, 2)]), \
+                mock.patch('minesweep.display_board') as mocked_display, \
+                mock.patch('builtins.print') as mocked_print, \
+                mock.patch('builtins.input', side_effect=['1 1 1 2 1 3', '3 1 3 2 3 3 2 2']):
+            minesweep.play_game(3, 3, 2)
+        self.assertIn('Congratulations', mocked_print.call_args[0][0])
+        self.assertEqual(mocked_display.call_count, 3)
+
+    def test_full_redraw_after_error(self):
+        """check that the whole board is redrawn before an error message"""
+        with mock.patch('minesweep.setup_mines', return_value=[(2, 2)]), \
+                mock.patch('minesweep.display_board') as mocked_display, \
+                mock.patch('builtins.print'), \
+                mock.patch('builtins.input', side_effect=['x', '9 9', '1 1']):
+            minesweep.play_game(3, 3, 1)
+        self.assertEqual([len(call[0]) for call in mocked_display.call_args_list[:3]], [1, 1, 1])
+        self.assertEqual(mocked_display.call_count, 4)
+
+    def test_no_win_while_locations_are_covered(self):
+        """check that we keep asking for moves until the last location is cleared"""
+        with mock.patch('minesweep.setup_mines', return_value=[(1, 0), (1, 2)]), \
+                mock.patch('minesweep.display_board'), \
+                mock.patch('builtins.print') as mocked_print, \
+                mock.patch('builtins.input', side_effect=['1 1', '1 2', '1 3', '3 1', '3 2', '3 3', '2 2']):
+            minesweep.play_game(3, 3, 2)
+        self.assertIn('Congratulations', mocked_print.call_args[0][0])
+        self.assertEqual(mocked_print.call_count, 1)
+
+
+class TestMain(unittest.TestCase):
+    """test function main, and playing from a stream of moves with play_script"""
+
+    def test_play_script(self):
+        """check that a script is played without prompts, skipping invalid lines"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        output = io.StringIO()
+        record = minesweep.play_script(game, ['3 2\n', 'x\n', '\n', 'f 3 3 r 1 1\n', '4 4\n'],
+                                       'every', output)
+        self.assertEqual(record['result'], 'won')
+        self.assertEqual((record['moves'], record['covered'], record['errors']), (2, 1, 1))
+        # Once after each valid line, and once at the end
+        self.assertEqual(output.getvalue().count('x|'), 2 * 3)
+        self.assertNotIn(minesweep.CLEAR_SCREEN, output.getvalue())
+
+    def test_stop_on_q(self):
+        """check that q ends the game, without exiting"""
+        game = minesweep.Game(3, 3, 1, mines=[(2, 2)])
+        record = minesweep.play_script(game, ['3 2', 'q', '1 1'])
+        self.assertEqual((record['result'], record['moves']), ('playing', 1))
+
+    def test_main_with_arguments(self):
+        """check that main plays from standard input and writes a JSON record"""
+        with mock.patch('sys.stdin', io.StringIO('1 1\n5 5 9 9\n')), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.assertEqual(minesweep.main(['--width', '9', '--height', '9', '--mines', '10',
+                                             '--seed', '3']), 0)
+        record = json.loads(output.getvalue())
+        game = minesweep.Game(9, 9, 10, seed=3)
+        game.play(minesweep.parse_moves('1 1'))
+        game.play(minesweep.parse_moves('5 5 9 9'))
+        self.assertEqual((record['seed'], record['covered'], record['result']),
+                         (3, game.covered, game.result or 'playing'))
+        self.assertNotIn('three_bv', record)
+
+    def test_main_with_three_bv(self):
+        """check that the 3BV is only in the record when asked for"""
+        with mock.patch('sys.stdin', io.StringIO('1 1\n')), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as output:
+            minesweep.main(['--width', '9', '--height', '9', '--mines', '10', '--seed', '3',
+                            '--three-bv'])
+        record = json.loads(output.getvalue())
+        self.assertEqual(record['three_bv'], minesweep.Game(9, 9, 10, seed=3).three_bv)
+
+    def test_main_needs_size(self):
+        """check that main wants width, height and mines together"""
+        with mock.patch('sys.stderr', new_callable=io.StringIO):
+            self.assertRaises(SystemExit, minesweep.main, ['--width', '9'])
+            self.assertRaises(SystemExit, minesweep.main, ['--seed', '1'])
+
+    def test_main_missing_moves_file(self):
+        """check that a moves file that can't be opened is a usage error"""
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as errors:
+            with self.assertRaises(SystemExit) as raised:
+                minesweep.main(['--width', '9', '--height', '9', '--mines', '10',
+                                '--moves', os.path.join(tempfile.gettempdir(), 'no', 'moves')])
+        self.assertEqual(raised.exception.code, 2)
+        self.assertIn("can't open --moves file", errors.getvalue())
+
+    def test_main_without_arguments(self):
+        """check that main plays interactively without arguments"""
+        with mock.patch('minesweep.get_game_parameters', return_value=(3, 3, 1)), \
+                mock.patch('minesweep.play_game') as mocked_play_game:
+            minesweep.main([])
+        mocked_play_game.assert_called_once_with(3, 3, 1)
+
+
+@unittest.skipIf(numpy_engine is None, 'numpy is not installed')
+class TestNumpyEngine(unittest.TestCase):
+    """test the numpy version of the board functions against the list version"""
+
+    def setUp(self):
+        self.width = 30
+        self.height = 20
+        self.mine_mask = numpy_engine.setup_mines(self.width, self.height, 60, rng=1)
+        self.mines = [(x, y) for y in range(self.height) for x in range(self.width)
+                      if self.mine_mask[y, x]]
+        self.counts = numpy_engine.setup_counts(self.mine_mask)
+
+    def test_number_of_mines(self):
+        """check we have as many mines as intended"""
+        self.assertEqual(self.mine_mask.sum(), 60)
+
+    def test_counts_equal_list_counts(self):
+        """check that counts equal those from minesweep.setup_counts"""
+        self.assertEqual(self.counts.tolist(),
+                         minesweep.setup_counts(self.mines, self.width, self.height))
+
+    def test_update_board_equals_list_update_board(self):
+        """check that every move clears the same locations as minesweep.update_board"""
+        board = numpy_engine.setup_board(self.width, self.height)
+        list_board = minesweep.setup_board(self.width, self.height)
+        labels = numpy_engine.setup_labels(self.counts)
+        for y in range(self.height):
+            for x in range(self.width):
+                if (x, y) not in self.mines:
+                    cleared = numpy_engine.update_board((x, y), board, self.counts, labels)
+                    list_cleared = minesweep.update_board(
+                        (x, y), list_board, self.mines, self.width, self.height)
+                    self.assertEqual(sorted(cleared.tolist()),
+                                     sorted(y * self.width + x for x, y in list_cleared))
+        self.assertEqual(board.tolist(), list_board)
+
 
 if __name__ == '__main__':
     unittest.main()